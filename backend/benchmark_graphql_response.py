@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark for GraphQL response encoding.
+
+Compares the stock graphene-django path (stdlib json, uncompressed) with
+core.views.GraphQLView (orjson when installed, brotli/gzip compression)
+for a GetTasks-shaped payload.
+
+Usage: python benchmark_graphql_response.py [task_count ...]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+import django
+
+# Add the project directory to the Python path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Set up Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.utils.text import compress_string
+
+from core import views
+
+STATUSES = ['TODO', 'IN_PROGRESS', 'DONE']
+
+
+def build_payload(task_count):
+    """Build a result shaped like the frontend's GetTasks query."""
+    return {
+        'data': {
+            'tasks': [
+                {
+                    'id': str(i),
+                    'title': f"Task {i}",
+                    'description': f"Description for task {i} " * 4,
+                    'status': STATUSES[i % 3],
+                    'assigneeEmail': f"user{i % 50}@example.com",
+                    'dueDate': '2026-03-15T12:00:00+00:00',
+                    'createdAt': '2026-01-01T09:30:00.123456+00:00',
+                    'updatedAt': '2026-01-02T10:45:00.654321+00:00',
+                }
+                for i in range(task_count)
+            ]
+        }
+    }
+
+
+def measure(func, number):
+    seconds = timeit.timeit(func, number=number) / number
+    return len(func()), seconds * 1000
+
+
+def run_benchmark(task_count, number=20):
+    payload = build_payload(task_count)
+
+    cases = [
+        ('stdlib json', lambda: json.dumps(payload, separators=(',', ':')).encode('utf-8')),
+        ('fast json', lambda: views.dumps(payload)),
+        ('fast json + gzip', lambda: compress_string(views.dumps(payload))),
+    ]
+    if views.brotli is not None:
+        quality = views.GraphQLView.brotli_quality
+        cases.append(
+            ('fast json + br', lambda: views.brotli.compress(views.dumps(payload), quality=quality))
+        )
+
+    print(f"\n{task_count} tasks (orjson: {'yes' if views.orjson else 'no'}, "
+          f"brotli: {'yes' if views.brotli else 'no'})")
+    print(f"  {'encoding':<20}{'bytes':>12}{'ms/response':>14}")
+    for name, func in cases:
+        size, ms = measure(func, number)
+        print(f"  {name:<20}{size:>12}{ms:>14.3f}")
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [100, 1000, 10000]
+    for count in counts:
+        run_benchmark(count)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'core.ratelimit.RateLimitMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
@@ -154,3 +156,91 @@ CORS_ALLOW_CREDENTIALS = True
 GRAPHENE = {
     'SCHEMA': 'core.schema.schema',
 }
+
+# Cache-Control directives sent with cacheable GraphQL GET responses.
+# Clients and proxies may store them but must revalidate with the ETag.
+GRAPHQL_CACHE_CONTROL = {
+    'public': True,
+    'no_cache': True,
+}
+
+# GraphQL responses smaller than this many bytes are sent uncompressed.
+GRAPHQL_COMPRESSION_MIN_SIZE = 1024
+
+# On-demand profiling of /graphql/ requests (see core/profiling.py).
+# Requests sending `X-GraphQL-Profile: <TOKEN>` are always profiled; the
+# header is ignored while TOKEN is empty.
+GRAPHQL_PROFILING = {
+    'ENABLED': True,
+    'SAMPLE_RATE': float(os.environ.get('GRAPHQL_PROFILE_SAMPLE_RATE', '0')),
+    'TOKEN': os.environ.get('GRAPHQL_PROFILE_TOKEN', ''),
+    'DIRECTORY': BASE_DIR / 'profiles',
+    'SAMPLE_INTERVAL': 0.001,  # seconds between stack samples
+    'KEEP': 100,  # newest profiles kept per operation; 0 keeps all
+    'MAX_OPERATIONS': 200,  # operation folders before the rest go to anonymous/; 0 is unlimited
+}
+
+# Items per multipart payload for @stream list fields (see core/incremental.py).
+GRAPHQL_STREAM_BATCH_SIZE = 100
+
+# Warm up the schema, frontend operations and DB connections when the
+# WSGI/ASGI application is loaded, before the worker takes traffic.
+WARMUP_ON_STARTUP = True
+
+# Cold-start budget enforced by `manage.py warmup`, in milliseconds.
+STARTUP_BUDGET_MS = 2000
+
+# Archival of completed projects (see core/archive.py)
+ARCHIVE_AFTER_DAYS = 180
+ARCHIVE_CHUNK_SIZE = 500
+
+# Background jobs (see core/jobs.py and `manage.py run_workers`)
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1.0
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_BACKOFF = 5  # seconds, doubled on every retry
+JOB_LOCK_TIMEOUT = 600  # seconds without a progress report before a RUNNING job is reclaimed
+JOB_SHUTDOWN_TIMEOUT = 30  # seconds to let a worker finish its job on shutdown
+
+# Production server (gunicorn.conf.py) and the built-in preforking server
+# (core/server.py, `manage.py serve`)
+SERVE_BIND = '127.0.0.1:8000'
+SERVE_WORKERS = None  # processes; None means 2 per CPU + 1
+SERVE_MAX_REQUESTS = 10000  # recycle a worker after this many requests
+SERVE_MAX_RSS_MB = 512  # ...or once its resident memory exceeds this
+SERVE_SHUTDOWN_TIMEOUT = 30  # seconds for in-flight requests on shutdown
+SERVE_TIMEOUT = 30  # seconds a WSGI client may take to send its request (serve only)
+SERVE_MAX_REQUESTS_JITTER = 1000  # gunicorn only: up to this many extra requests per worker
+
+# Cross-organization report (see core/analytics.py and `manage.py org_analytics`)
+ANALYTICS_WORKERS = None  # processes; None means one per CPU
+ANALYTICS_SHARD_SIZE = 500  # organizations per shard
+
+# Per-organization and per-client admission control for /graphql/
+# (see core/ratelimit.py). Rates are tokens per second; queries cost
+# QUERY_COST and mutations MUTATION_COST tokens per root field.
+# LocalMemoryStore keeps buckets and /metrics/throttle/ counters in each
+# worker process, so with N workers an organization may get up to N times
+# these rates and the metrics show whichever worker answered. CacheStore
+# shares them through a cache such as Redis (settings_production.py uses it
+# when REDIS_URL is set).
+GRAPHQL_RATE_LIMIT = {
+    'ENABLED': True,
+    'STORE': 'core.ratelimit.LocalMemoryStore',
+    'ORG_RATE': 50.0,
+    'ORG_BURST': 200,
+    'CLIENT_RATE': 20.0,
+    'CLIENT_BURST': 100,
+    'QUERY_COST': 1,
+    'MUTATION_COST': 5,
+    'MAX_CONCURRENT_PER_ORG': 10,
+}
+
+# changesSince delta sync: the returned cursor trails the server clock by
+# this many seconds so late-committing writes are not skipped, and
+# tombstones older than the retention window force a full resync.
+CHANGES_SAFETY_MARGIN = 5
+CHANGES_TOMBSTONE_RETENTION_DAYS = 30
+
+# Rows deleted per transaction when purging projects and tasks (core/purge.py)
+PURGE_BATCH_SIZE = 1000
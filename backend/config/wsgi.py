@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Pay the schema/validation/DB connection cost before taking traffic.
+from core.warmup import warm_up_on_startup  # noqa: E402
+
+warm_up_on_startup()
@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Organization, Project, Task, TaskComment
+from django.db.models import Max, Sum
+from .models import (
+    ArchivedProject, ArchivedTask, ArchivedTaskComment, Job, Organization, OrganizationAnalytics,
+    Project, Task, TaskComment,
+)
 
 
 @admin.register(Organization)
@@ -30,3 +34,62 @@ class TaskCommentAdmin(admin.ModelAdmin):
     list_display = ('task', 'author_email', 'created_at')
     search_fields = ('content', 'author_email')
     date_hierarchy = 'created_at'
+
+
+@admin.register(ArchivedProject)
+class ArchivedProjectAdmin(admin.ModelAdmin):
+    list_display = ('name', 'organization', 'status', 'created_at', 'archived_at')
+    list_filter = ('organization',)
+    search_fields = ('name', 'description')
+    date_hierarchy = 'archived_at'
+
+
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    list_display = ('title', 'project', 'status', 'assignee_email', 'created_at')
+    search_fields = ('title', 'description', 'assignee_email')
+
+
+@admin.register(ArchivedTaskComment)
+class ArchivedTaskCommentAdmin(admin.ModelAdmin):
+    list_display = ('task', 'author_email', 'created_at')
+    search_fields = ('content', 'author_email')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'organization', 'status', 'progress', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('kind', 'error')
+    date_hierarchy = 'created_at'
+
+
+@admin.register(OrganizationAnalytics)
+class OrganizationAnalyticsAdmin(admin.ModelAdmin):
+    """Read-only view of the report written by `manage.py org_analytics`"""
+    change_list_template = 'admin/core/organizationanalytics/change_list.html'
+    list_display = (
+        'organization', 'total_projects', 'active_projects', 'completed_projects', 'total_tasks',
+        'todo_tasks', 'in_progress_tasks', 'completed_tasks', 'overdue_tasks', 'completion_rate', 'computed_at',
+    )
+    list_select_related = ('organization',)
+    search_fields = ('organization__name', 'organization__slug')
+    ordering = ('-total_tasks',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        totals = OrganizationAnalytics.objects.aggregate(
+            total_projects=Sum('total_projects'),
+            total_tasks=Sum('total_tasks'),
+            completed_tasks=Sum('completed_tasks'),
+            overdue_tasks=Sum('overdue_tasks'),
+            computed_at=Max('computed_at'),
+        )
+        if totals['total_tasks']:
+            totals['completion_rate'] = totals['completed_tasks'] / totals['total_tasks'] * 100
+        return super().changelist_view(request, extra_context={**(extra_context or {}), 'totals': totals})
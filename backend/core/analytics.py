@@ -0,0 +1,125 @@
+"""
+Platform-wide analytics across every organization.
+
+run_org_analytics() splits organizations into shards of consecutive ids.
+Each shard is computed with two grouped aggregate queries, one over projects
+and one over tasks, instead of a stats query per organization. With more
+than one worker the shards run in a forked process pool where every process
+opens its own database connection. Results are upserted into
+OrganizationAnalytics as shards complete.
+"""
+
+import multiprocessing
+import os
+from functools import partial
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Organization, OrganizationAnalytics, Project, Task
+
+COUNT_FIELDS = (
+    'total_projects', 'active_projects', 'completed_projects',
+    'total_tasks', 'todo_tasks', 'in_progress_tasks', 'completed_tasks', 'overdue_tasks',
+)
+
+
+def run_org_analytics(workers=None, shard_size=None, progress=None):
+    """Recompute OrganizationAnalytics for every organization.
+
+    progress, if given, is called with (shards_done, total_shards).
+    Returns ``{'organizations': ..., 'shards': ...}``.
+    """
+    workers = workers or settings.ANALYTICS_WORKERS or os.cpu_count()
+    shard_size = shard_size or settings.ANALYTICS_SHARD_SIZE
+    computed_at = timezone.now()
+    compute = partial(compute_shard, now=computed_at)
+
+    bounds = list(shards(shard_size))
+    organizations = 0
+
+    def merge(results):
+        nonlocal organizations
+        for done, rows in enumerate(results, 1):
+            save_report(rows, computed_at)
+            organizations += len(rows)
+            if progress is not None:
+                progress(done, len(bounds))
+
+    if workers <= 1 or len(bounds) <= 1:
+        merge(map(compute, bounds))
+    else:
+        # Children must not share the parent's connection; close it before
+        # forking and let every worker open its own.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(min(workers, len(bounds)), initializer=connections.close_all) as pool:
+            merge(pool.imap_unordered(compute, bounds))
+
+    return {'organizations': organizations, 'shards': len(bounds)}
+
+
+def shards(shard_size):
+    """Yield ``(first_id, last_id)`` ranges of shard_size organizations each"""
+    ids = list(Organization.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(ids), shard_size):
+        chunk = ids[start:start + shard_size]
+        yield chunk[0], chunk[-1]
+
+
+def compute_shard(bounds, now):
+    """Return ``{organization_id: stats}`` for the organizations with ids in bounds"""
+    first_id, last_id = bounds
+    rows = {
+        organization_id: dict.fromkeys(COUNT_FIELDS, 0)
+        for organization_id in Organization.objects.filter(id__range=bounds).values_list('id', flat=True)
+    }
+
+    projects = (
+        Project.objects.filter(organization__gte=first_id, organization__lte=last_id)
+        .values('organization_id')
+        .annotate(
+            total_projects=Count('id'),
+            active_projects=Count('id', filter=Q(status='ACTIVE')),
+            completed_projects=Count('id', filter=Q(status='COMPLETED')),
+        )
+        .order_by()
+    )
+    tasks = (
+        # Skip tasks under projects hidden by deleteProject, like visible_in()
+        Task.objects.filter(
+            organization__gte=first_id, organization__lte=last_id, project__deleted_at__isnull=True
+        )
+        .values('organization_id')
+        .annotate(
+            total_tasks=Count('id'),
+            todo_tasks=Count('id', filter=Q(status='TODO')),
+            in_progress_tasks=Count('id', filter=Q(status='IN_PROGRESS')),
+            completed_tasks=Count('id', filter=Q(status='DONE')),
+            overdue_tasks=Count('id', filter=Q(due_date__lt=now) & ~Q(status='DONE')),
+        )
+        .order_by()
+    )
+    for row in [*projects, *tasks]:
+        stats = rows.get(row.pop('organization_id'))
+        if stats is not None:
+            stats.update(row)
+
+    for stats in rows.values():
+        total = stats['total_tasks']
+        stats['completion_rate'] = (stats['completed_tasks'] / total * 100) if total > 0 else 0
+    return rows
+
+
+def save_report(rows, computed_at):
+    OrganizationAnalytics.objects.bulk_create(
+        [
+            OrganizationAnalytics(organization_id=organization_id, computed_at=computed_at, **stats)
+            for organization_id, stats in rows.items()
+        ],
+        update_conflicts=True,
+        unique_fields=['organization'],
+        update_fields=[*COUNT_FIELDS, 'completion_rate', 'computed_at'],
+    )
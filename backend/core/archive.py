@@ -0,0 +1,210 @@
+"""
+Hot/cold archival of completed projects.
+
+Completed projects are moved, together with their tasks and comments, from
+the hot ``core_project``/``core_task``/``core_taskcomment`` tables into the
+``Archived*`` tables, and can be moved back with restore_project(). Rows
+keep their original primary keys and created_at. Archiving writes
+tombstones; restoring deletes them again and refreshes updated_at, so delta
+sync clients see archived rows disappear and restored rows come back.
+
+Children are moved in chunks of ``chunk_size`` tasks (plus their comments),
+each chunk in its own short transaction, so archiving a large project never
+holds locks for long. The project row itself is only locked at the end: if
+it was edited or deleted while the children were moving, they are moved
+back and the project stays hot. Every step is safe to re-run after a
+failure.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Value, When
+from django.utils import timezone
+
+from .models import (
+    ArchivedProject,
+    ArchivedTask,
+    ArchivedTaskComment,
+    Organization,
+    Project,
+    Task,
+    TaskComment,
+    Tombstone,
+)
+from .purge import raw_delete, tombstones
+
+PROJECT_FIELDS = ('organization_id', 'name', 'description', 'status', 'due_date',
+                  'created_at', 'updated_at')
+TASK_FIELDS = ('title', 'description', 'status', 'assignee_email', 'due_date',
+               'created_at', 'updated_at')
+COMMENT_FIELDS = ('task_id', 'content', 'author_email', 'created_at')
+
+
+def archive_completed_projects(before, chunk_size=None, organization=None, progress=None):
+    """Archive every COMPLETED project last updated before the cutoff.
+
+    progress, if given, is called with (done, total) after each project.
+    Returns the number of projects archived.
+    """
+    projects = Project.objects.filter(status='COMPLETED', updated_at__lt=before)
+    if organization is not None:
+        projects = projects.filter(organization=organization)
+
+    project_ids = list(projects.order_by('id').values_list('id', flat=True))
+    for done, project_id in enumerate(project_ids, 1):
+        archive_project(project_id, chunk_size=chunk_size)
+        if progress is not None:
+            progress(done, len(project_ids))
+    return len(project_ids)
+
+
+def archive_project(project_id, chunk_size=None):
+    """Move one project and its tasks and comments into the archive tables"""
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+
+    project = Project.objects.filter(pk=project_id).first()
+    if project is None:
+        return False
+
+    ArchivedProject.objects.get_or_create(
+        id=project.id,
+        defaults=dict(_copy(project, PROJECT_FIELDS), archived_at=timezone.now()),
+    )
+
+    while True:
+        with transaction.atomic():
+            tasks = list(
+                Task.objects.filter(project_id=project_id)
+                .select_for_update()
+                .order_by('id')[:chunk_size]
+            )
+            if not tasks:
+                break
+            _archive_tasks(project, tasks)
+
+    with transaction.atomic():
+        current = Project.all_objects.select_for_update().filter(pk=project_id).first()
+        if current is None:
+            # Deleted outright; keep the archived copy rather than lose it
+            return False
+        if current.status == 'COMPLETED' and current.updated_at == project.updated_at and not current.deleted_at:
+            # Tasks created since the last chunk; the lock keeps new ones out
+            _archive_tasks(project, list(
+                Task.objects.filter(project_id=project_id).select_for_update().order_by('id')
+            ))
+            raw_delete(Project.objects.filter(pk=project_id))
+            Tombstone.objects.bulk_create(tombstones(project.organization_id, 'Project', [project]))
+            Organization.bump_data_version(pk=project.organization_id)
+            return True
+
+    # Edited or hidden by deleteProject while the children were moving
+    restore_project(project_id, chunk_size=chunk_size)
+    return False
+
+
+def _archive_tasks(project, tasks):
+    """Move tasks and their comments to the archive tables (in a transaction)"""
+    if not tasks:
+        return
+    task_ids = [task.id for task in tasks]
+    comments = list(TaskComment.objects.filter(task_id__in=task_ids))
+
+    ArchivedTask.objects.bulk_create([
+        ArchivedTask(id=task.id, project_id=project.id, **_copy(task, TASK_FIELDS))
+        for task in tasks
+    ], ignore_conflicts=True)
+    ArchivedTaskComment.objects.bulk_create([
+        ArchivedTaskComment(id=comment.id, **_copy(comment, COMMENT_FIELDS))
+        for comment in comments
+    ], ignore_conflicts=True)
+
+    raw_delete(TaskComment.objects.filter(task_id__in=task_ids))
+    raw_delete(Task.objects.filter(pk__in=task_ids))
+    Tombstone.objects.bulk_create([
+        *tombstones(project.organization_id, 'TaskComment', comments),
+        *tombstones(project.organization_id, 'Task', tasks),
+    ])
+
+
+def restore_project(project_id, chunk_size=None):
+    """Move an archived project and its children back into the hot tables"""
+    chunk_size = chunk_size or settings.ARCHIVE_CHUNK_SIZE
+
+    archived = ArchivedProject.objects.filter(pk=project_id).first()
+    if archived is None:
+        return None
+
+    with transaction.atomic():
+        if not Project.all_objects.filter(pk=project_id).exists():
+            Project.objects.bulk_create([
+                Project(id=archived.id, **_copy(archived, PROJECT_FIELDS))
+            ])
+            _restore_timestamps(Project, [archived], ('created_at',))
+
+    while True:
+        with transaction.atomic():
+            tasks = list(
+                ArchivedTask.objects.filter(project_id=project_id)
+                .select_for_update()
+                .order_by('id')[:chunk_size]
+            )
+            if not tasks:
+                break
+            task_ids = [task.id for task in tasks]
+            comments = list(ArchivedTaskComment.objects.filter(task_id__in=task_ids))
+
+            Task.objects.bulk_create([
+                Task(
+                    id=task.id,
+                    project_id=project_id,
+                    organization_id=archived.organization_id,
+                    **_copy(task, TASK_FIELDS)
+                )
+                for task in tasks
+            ], ignore_conflicts=True)
+            _restore_timestamps(Task, tasks, ('created_at',))
+            TaskComment.objects.bulk_create([
+                TaskComment(
+                    id=comment.id,
+                    organization_id=archived.organization_id,
+                    **_copy(comment, COMMENT_FIELDS)
+                )
+                for comment in comments
+            ], ignore_conflicts=True)
+            _restore_timestamps(TaskComment, comments, ('created_at',))
+
+            raw_delete(ArchivedTaskComment.objects.filter(task_id__in=task_ids))
+            raw_delete(ArchivedTask.objects.filter(pk__in=task_ids))
+            _delete_tombstones(archived.organization_id, 'Task', task_ids)
+            _delete_tombstones(archived.organization_id, 'TaskComment', [c.id for c in comments])
+
+    with transaction.atomic():
+        raw_delete(ArchivedProject.objects.filter(pk=project_id))
+        _delete_tombstones(archived.organization_id, 'Project', [project_id])
+        Organization.bump_data_version(pk=archived.organization_id)
+    return Project.all_objects.get(pk=project_id)
+
+
+def _delete_tombstones(organization_id, model, object_ids):
+    """Drop the tombstones of rows that are live again"""
+    if object_ids:
+        raw_delete(Tombstone.objects.filter(
+            organization_id=organization_id, model=model, object_id__in=object_ids
+        ))
+
+
+def _copy(instance, fields):
+    return {field: getattr(instance, field) for field in fields}
+
+
+def _restore_timestamps(model, sources, fields):
+    """Overwrite auto_now_add values set by bulk_create with the originals"""
+    if not sources:
+        return
+    model.objects.filter(pk__in=[source.pk for source in sources]).update(**{
+        field: Case(
+            *[When(pk=source.pk, then=Value(getattr(source, field))) for source in sources],
+            output_field=model._meta.get_field(field),
+        )
+        for field in fields
+    })
@@ -0,0 +1,268 @@
+"""
+Incremental delivery (@defer / @stream) for GraphQL queries.
+
+graphql-core 3.2 predates incremental delivery, so this module defines the
+two directives and an ExecutionContext that understands them:
+
+* ``@defer`` on a fragment leaves its fields out of the initial result and
+  runs them afterwards, one payload per fragment and parent object.
+* ``@stream(initialCount: n)`` on a list field returns the first n items in
+  the initial result and the rest in batches of
+  ``GRAPHQL_STREAM_BATCH_SIZE``. QuerySets are read with ``.iterator()``,
+  i.e. through a server-side cursor where the database supports it, so only
+  one batch is held in memory at a time.
+
+Payloads follow the 2022-08-24 incremental delivery format used by Apollo
+Client (``data``/``hasNext`` first, then ``incremental``/``hasNext``).
+Clients that don't ask for ``multipart/mixed`` get the complete result in
+one response; the directives are then ignored.
+"""
+
+from collections import deque
+from itertools import chain, islice
+
+from django.conf import settings
+from django.db.models import QuerySet
+from graphql import (
+    BREAK,
+    DirectiveLocation,
+    FieldNode,
+    GraphQLArgument,
+    GraphQLBoolean,
+    GraphQLDirective,
+    GraphQLError,
+    GraphQLInt,
+    GraphQLNonNull,
+    GraphQLString,
+    InlineFragmentNode,
+    Visitor,
+    located_error,
+    visit,
+)
+from graphql.execution import ExecutionContext
+from graphql.execution.collect_fields import (
+    does_fragment_condition_match,
+    get_field_entry_key,
+    should_include_node,
+)
+from graphql.execution.execute import invalid_return_type_error
+from graphql.execution.values import get_directive_values
+from graphql.pyutils import is_iterable
+
+DeferDirective = GraphQLDirective(
+    name='defer',
+    locations=[DirectiveLocation.FRAGMENT_SPREAD, DirectiveLocation.INLINE_FRAGMENT],
+    args={
+        'if': GraphQLArgument(GraphQLNonNull(GraphQLBoolean), default_value=True),
+        'label': GraphQLArgument(GraphQLString),
+    },
+    description='Deliver the fragment after the rest of the result.',
+)
+
+StreamDirective = GraphQLDirective(
+    name='stream',
+    locations=[DirectiveLocation.FIELD],
+    args={
+        'if': GraphQLArgument(GraphQLNonNull(GraphQLBoolean), default_value=True),
+        'label': GraphQLArgument(GraphQLString),
+        'initialCount': GraphQLArgument(GraphQLNonNull(GraphQLInt), default_value=0),
+    },
+    description='Deliver the items of a list field in batches after the initial result.',
+)
+
+INCREMENTAL_DIRECTIVES = (DeferDirective, StreamDirective)
+
+
+class _IncrementalDirectiveFinder(Visitor):
+    found = False
+
+    def enter_directive(self, node, *args):
+        if node.name.value in ('defer', 'stream'):
+            self.found = True
+            return BREAK
+
+
+def uses_incremental_delivery(document):
+    """Return True if the document uses @defer or @stream anywhere"""
+    finder = _IncrementalDirectiveFinder()
+    visit(document, finder)
+    return finder.found
+
+
+def with_errors(payload, errors):
+    if errors:
+        payload['errors'] = [error.formatted for error in errors]
+    return payload
+
+
+class DeferredFragment:
+    def __init__(self, label, parent_type, source, path, selection_set):
+        self.label = label
+        self.parent_type = parent_type
+        self.source = source
+        self.path = path
+        self.selection_set = selection_set
+
+    def run(self, context):
+        fields, deferred = context.collect(self.parent_type, [self.selection_set])
+        data = context.execute_fields(self.parent_type, self.source, self.path, fields)
+        context.defer(self.parent_type, self.source, self.path, deferred)
+        return {'data': data, 'path': self.path.as_list() if self.path else []}
+
+
+class StreamedList:
+    def __init__(self, label, item_type, field_nodes, info, path, rows, start):
+        self.label = label
+        self.item_type = item_type
+        self.field_nodes = field_nodes
+        self.info = info
+        self.path = path
+        self.rows = rows
+        self.index = start
+
+    def run(self, context):
+        start = self.index
+        items = []
+        for item in islice(self.rows, context.batch_size):
+            item_path = self.path.add_key(self.index, None)
+            try:
+                items.append(context.complete_value(
+                    self.item_type, self.field_nodes, self.info, item_path, item
+                ))
+            except Exception as raw_error:
+                error = located_error(raw_error, self.field_nodes, item_path.as_list())
+                context.handle_field_error(error, self.item_type, item_path)
+                items.append(None)
+            self.index += 1
+        if context.has_more(self):
+            context.pending.append(self)
+        return {'items': items, 'path': [*self.path.as_list(), start]}
+
+
+class IncrementalExecutionContext(ExecutionContext):
+    """ExecutionContext that postpones @defer fragments and @stream items.
+
+    Call execute_incrementally() instead of executing the operation
+    directly; it yields the response payloads as dicts.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_size = settings.GRAPHQL_STREAM_BATCH_SIZE
+        self.pending = deque()
+        self._collected = {}
+
+    def execute_incrementally(self):
+        errors = self.collected_errors.errors
+        try:
+            data = self.execute_operation(self.operation, self.root_value)
+        except GraphQLError as error:
+            errors.append(error)
+            data = None
+            self.pending.clear()
+        yield with_errors({'data': data, 'hasNext': bool(self.pending)}, errors)
+
+        while self.pending:
+            record = self.pending.popleft()
+            start = len(errors)
+            try:
+                entry = record.run(self)
+            except GraphQLError as error:
+                # A non-null field failed; the whole fragment or batch is null
+                entry = {'items' if isinstance(record, StreamedList) else 'data': None,
+                         'path': record.path.as_list() if record.path else []}
+                errors.append(error)
+            if record.label is not None:
+                entry['label'] = record.label
+            yield {'incremental': [with_errors(entry, errors[start:])], 'hasNext': bool(self.pending)}
+
+    def execute_operation(self, operation, root_value):
+        root_type = self.schema.get_root_type(operation.operation)
+        fields, deferred = self.collect(root_type, [operation.selection_set])
+        data = self.execute_fields(root_type, root_value, None, fields)
+        self.defer(root_type, root_value, None, deferred)
+        return data
+
+    def complete_object_value(self, return_type, field_nodes, info, path, result):
+        key = (return_type, *map(id, field_nodes))
+        collected = self._collected.get(key)
+        if collected is None:
+            collected = self._collected[key] = self.collect(
+                return_type, [node.selection_set for node in field_nodes if node.selection_set]
+            )
+        fields, deferred = collected
+
+        if return_type.is_type_of and not return_type.is_type_of(result, info):
+            raise invalid_return_type_error(return_type, result, field_nodes)
+
+        data = self.execute_fields(return_type, result, path, fields)
+        self.defer(return_type, result, path, deferred)
+        return data
+
+    def complete_list_value(self, return_type, field_nodes, info, path, result):
+        stream = get_directive_values(StreamDirective, field_nodes[0], self.variable_values)
+        if not stream or not stream['if'] or not is_iterable(result):
+            return super().complete_list_value(return_type, field_nodes, info, path, result)
+
+        if isinstance(result, QuerySet):
+            rows = result.iterator(chunk_size=self.batch_size)
+        else:
+            rows = iter(result)
+        initial = list(islice(rows, max(stream['initialCount'], 0)))
+        completed = super().complete_list_value(return_type, field_nodes, info, path, initial)
+
+        record = StreamedList(
+            stream.get('label'), return_type.of_type, field_nodes, info, path, rows, len(initial)
+        )
+        if self.has_more(record):
+            self.pending.append(record)
+        return completed
+
+    @staticmethod
+    def has_more(record):
+        """Peek at a stream so hasNext is accurate without an empty trailing payload"""
+        for item in record.rows:
+            record.rows = chain([item], record.rows)
+            return True
+        return False
+
+    def defer(self, parent_type, source, path, deferred):
+        for label, selection_set in deferred:
+            self.pending.append(DeferredFragment(label, parent_type, source, path, selection_set))
+
+    def collect(self, runtime_type, selection_sets):
+        """Collect fields like graphql-core does, setting @defer fragments aside.
+
+        Returns ``(fields, deferred)`` where deferred is a list of
+        ``(label, selection_set)``.
+        """
+        fields, deferred, visited = {}, [], set()
+        for selection_set in selection_sets:
+            self._collect(runtime_type, selection_set, fields, deferred, visited)
+        return fields, deferred
+
+    def _collect(self, runtime_type, selection_set, fields, deferred, visited):
+        for selection in selection_set.selections:
+            if not should_include_node(self.variable_values, selection):
+                continue
+            if isinstance(selection, FieldNode):
+                fields.setdefault(get_field_entry_key(selection), []).append(selection)
+                continue
+
+            if isinstance(selection, InlineFragmentNode):
+                fragment = selection
+            else:
+                if selection.name.value in visited:
+                    continue
+                visited.add(selection.name.value)
+                fragment = self.fragments.get(selection.name.value)
+                if fragment is None:
+                    continue
+            if not does_fragment_condition_match(self.schema, fragment, runtime_type):
+                continue
+
+            defer = get_directive_values(DeferDirective, selection, self.variable_values)
+            if defer and defer['if']:
+                deferred.append((defer.get('label'), fragment.selection_set))
+            else:
+                self._collect(runtime_type, fragment.selection_set, fields, deferred, visited)
@@ -0,0 +1,216 @@
+"""
+DB-backed background jobs.
+
+Jobs are rows in ``core_job``. enqueue() inserts one; workers started by
+``manage.py run_workers`` claim them with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` (or an atomic compare-and-set UPDATE where the database has no
+SKIP LOCKED, e.g. SQLite), run the registered handler and record the
+result. Failed jobs are retried with exponential backoff until
+``max_attempts`` is reached.
+
+Handlers are registered with the @handler decorator and receive the Job.
+A claim is a lease of ``JOB_LOCK_TIMEOUT`` seconds, after which another
+worker may take the job over; long-running handlers must call
+``job.report_progress(done, total)`` more often than that to renew it.
+Attempts are counted when a job is claimed, so a job that keeps killing its
+worker still runs out of attempts.
+"""
+
+import logging
+import os
+import random
+import signal
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job, JobLeaseLost
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+
+class UnknownJobKind(Exception):
+    pass
+
+
+def handler(kind):
+    """Register the decorated function as the handler for jobs of this kind"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, organization=None, payload=None, max_attempts=None):
+    if kind not in HANDLERS:
+        raise UnknownJobKind(f"Unknown job kind: {kind}")
+    return Job.objects.create(
+        kind=kind,
+        organization=organization,
+        payload=payload or {},
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def claim_job(worker_id):
+    """Claim the next runnable job for worker_id, or return None"""
+    now = timezone.now()
+    runnable = Q(status='QUEUED', run_after__lte=now) | Q(
+        # Jobs whose worker died mid-run
+        status='RUNNING', locked_at__lt=now - timedelta(seconds=settings.JOB_LOCK_TIMEOUT)
+    )
+    claimed = dict(
+        status='RUNNING', locked_by=worker_id, locked_at=now, updated_at=now, attempts=F('attempts') + 1
+    )
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = (
+                Job.objects.select_for_update(skip_locked=True)
+                .filter(runnable)
+                .order_by('run_after', 'id')
+                .first()
+            )
+            if job is None:
+                return None
+            Job.objects.filter(pk=job.pk).update(**claimed)
+    else:
+        while True:
+            candidate = (
+                Job.objects.filter(runnable)
+                .order_by('run_after', 'id')
+                .values('pk', 'status', 'locked_at')
+                .first()
+            )
+            if candidate is None:
+                return None
+            # Compare-and-set: only one worker's UPDATE can match the old state
+            won = Job.objects.filter(
+                pk=candidate['pk'],
+                status=candidate['status'],
+                locked_at=candidate['locked_at'],
+            ).update(**claimed)
+            if won:
+                job = Job(pk=candidate['pk'])
+                break
+
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome"""
+    if job.attempts > job.max_attempts:
+        # Reclaimed after its worker died on the last attempt
+        logger.warning("Job %s abandoned after %s attempts", job.pk, job.max_attempts)
+        _finish(job, status='FAILED', error="Worker stopped while running the job")
+        return False
+    try:
+        func = HANDLERS.get(job.kind)
+        if func is None:
+            raise UnknownJobKind(f"Unknown job kind: {job.kind}")
+        result = func(job)
+    except JobLeaseLost:
+        logger.warning("Job %s was reclaimed by another worker, abandoning", job.pk)
+        return False
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s failed (attempt %s/%s)", job.pk, job.attempts, job.max_attempts)
+        if job.attempts < job.max_attempts:
+            delay = settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            _finish(job, status='QUEUED', error=error,
+                    run_after=timezone.now() + timedelta(seconds=delay * random.uniform(1, 1.5)))
+        else:
+            _finish(job, status='FAILED', error=error)
+        return False
+
+    return _finish(job, status='SUCCEEDED', result=result, progress=100, error='')
+
+
+def run_worker(worker_id=None, stop=None, max_jobs=None):
+    """Claim and run jobs until stop() returns true or max_jobs have run"""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or (lambda: False)
+    done = 0
+    while not stop() and (max_jobs is None or done < max_jobs):
+        close_old_connections()
+        job = claim_job(worker_id)
+        if job is None:
+            if max_jobs is not None:
+                break
+            time.sleep(settings.JOB_POLL_INTERVAL)
+            continue
+        run_job(job)
+        done += 1
+    return done
+
+
+def worker_process(worker_id):
+    """Entry point for a forked worker process"""
+    # Never reuse the parent's database connection after fork
+    connection.close()
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    run_worker(worker_id, stop=lambda: bool(stopping))
+
+
+def _finish(job, **fields):
+    """Record the outcome, unless another worker has reclaimed the job"""
+    for name, value in fields.items():
+        setattr(job, name, value)
+    updated = Job.objects.filter(pk=job.pk, status='RUNNING', locked_by=job.locked_by).update(
+        locked_by='',
+        locked_at=None,
+        updated_at=timezone.now(),
+        **fields
+    )
+    if not updated:
+        logger.warning("Job %s was reclaimed by another worker, outcome discarded", job.pk)
+    return bool(updated)
+
+
+# Built-in handlers
+
+@handler('project_stats')
+def project_stats_job(job):
+    from .stats import compute_project_stats
+
+    return compute_project_stats(job.organization)
+
+
+@handler('archive_projects')
+def archive_projects_job(job):
+    from .archive import archive_completed_projects
+
+    archived = archive_completed_projects(
+        datetime.fromisoformat(job.payload['before']),
+        organization=job.organization,
+        progress=job.report_progress,
+    )
+    return {'archived': archived}
+
+
+@handler('purge_project')
+def purge_project_job(job):
+    from .purge import purge_project
+
+    deleted = purge_project(
+        job.payload['project_id'], job.organization_id, progress=job.report_progress
+    )
+    return {'deleted_tasks': deleted}
+
+
+@handler('prune_tombstones')
+def prune_tombstones_job(job):
+    from .purge import prune_tombstones
+
+    return {'deleted': prune_tombstones()}
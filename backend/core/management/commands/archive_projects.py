@@ -0,0 +1,58 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core.archive import archive_completed_projects, restore_project
+from core.models import Organization
+
+
+class Command(BaseCommand):
+    help = 'Move COMPLETED projects (with tasks and comments) into the archive tables, or restore one'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before',
+            help='Archive projects last updated before this date (YYYY-MM-DD). '
+                 'Defaults to ARCHIVE_AFTER_DAYS ago.',
+        )
+        parser.add_argument('--organization', help='Only archive projects of this organization slug')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.ARCHIVE_CHUNK_SIZE,
+            help='Tasks moved per transaction',
+        )
+        parser.add_argument('--restore', type=int, metavar='PROJECT_ID', help='Restore an archived project')
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            project = restore_project(options['restore'], chunk_size=options['chunk_size'])
+            if project is None:
+                raise CommandError(f"Archived project {options['restore']} not found")
+            self.stdout.write(self.style.SUCCESS(f"Restored project {project.id} ({project.name})"))
+            return
+
+        if options['before']:
+            day = parse_date(options['before'])
+            if day is None:
+                raise CommandError("--before must be a date in YYYY-MM-DD format")
+            before = timezone.make_aware(datetime.combine(day, time.min))
+        else:
+            before = timezone.now() - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+
+        organization = None
+        if options['organization']:
+            try:
+                organization = Organization.objects.get(slug=options['organization'])
+            except Organization.DoesNotExist:
+                raise CommandError(f"Organization {options['organization']} not found")
+
+        count = archive_completed_projects(
+            before, chunk_size=options['chunk_size'], organization=organization
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {count} project(s) completed before {before:%Y-%m-%d}"
+        ))
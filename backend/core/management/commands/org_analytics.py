@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.analytics import run_org_analytics
+
+
+class Command(BaseCommand):
+    help = 'Recompute the cross-organization analytics report using a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.ANALYTICS_WORKERS,
+            help='Worker processes (default: ANALYTICS_WORKERS, or one per CPU)',
+        )
+        parser.add_argument(
+            '--shard-size',
+            type=int,
+            default=settings.ANALYTICS_SHARD_SIZE,
+            help='Organizations per shard',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+
+        def progress(done, total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {done}/{total} shards")
+
+        result = run_org_analytics(
+            workers=options['workers'],
+            shard_size=options['shard_size'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Computed analytics for {result['organizations']} organization(s) "
+            f"in {result['shards']} shard(s) in {time.perf_counter() - start:.1f}s"
+        ))
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import enqueue
+from core.purge import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Delete changesSince tombstones older than CHANGES_TOMBSTONE_RETENTION_DAYS (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--enqueue',
+            action='store_true',
+            help='Queue a prune_tombstones job for the workers instead of pruning here',
+        )
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = enqueue('prune_tombstones')
+            self.stdout.write(self.style.SUCCESS(f"Queued job {job.pk}"))
+            return
+
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} tombstone(s) older than {settings.CHANGES_TOMBSTONE_RETENTION_DAYS} days"
+        ))
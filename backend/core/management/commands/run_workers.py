@@ -0,0 +1,73 @@
+import multiprocessing
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import run_worker, worker_process
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of background job worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.JOB_WORKERS,
+            help='Number of worker processes',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Run queued jobs in this process and exit when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        if options['burst']:
+            done = run_worker(max_jobs=float('inf'))
+            self.stdout.write(self.style.SUCCESS(f"Ran {done} job(s)"))
+            return
+
+        # Workers are forked so they inherit the loaded app and registry
+        context = multiprocessing.get_context('fork')
+        hostname = socket.gethostname()
+        stopping = []
+
+        def stop(signum, frame):
+            stopping.append(signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        def spawn(index):
+            connections.close_all()
+            process = context.Process(
+                target=worker_process,
+                args=(f"{hostname}:worker-{index}",),
+                daemon=True,
+            )
+            process.start()
+            return process
+
+        pool = {index: spawn(index) for index in range(options['workers'])}
+        self.stdout.write(f"Started {len(pool)} worker(s)")
+
+        while not stopping:
+            for index, process in list(pool.items()):
+                if not process.is_alive():
+                    self.stderr.write(f"Worker {index} exited with {process.exitcode}, restarting")
+                    pool[index] = spawn(index)
+            time.sleep(1)
+
+        self.stdout.write("Stopping workers...")
+        for process in pool.values():
+            process.terminate()
+        for process in pool.values():
+            process.join(settings.JOB_SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.kill()
+        self.stdout.write(self.style.SUCCESS("Workers stopped"))
@@ -0,0 +1,98 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.server import Arbiter, bind_socket
+from core.warmup import WarmupError, warm_up
+
+
+class Command(BaseCommand):
+    help = 'Serve the site with preforked, pre-warmed WSGI or ASGI worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bind',
+            default=settings.SERVE_BIND,
+            help='host:port to listen on',
+        )
+        parser.add_argument(
+            '--interface',
+            choices=('wsgi', 'asgi'),
+            default='wsgi',
+            help='Application interface; asgi requires uvicorn',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=settings.SERVE_WORKERS,
+            help='Worker processes (default: SERVE_WORKERS, or 2 per CPU + 1)',
+        )
+        parser.add_argument(
+            '--max-requests',
+            type=int,
+            default=settings.SERVE_MAX_REQUESTS,
+            help='Recycle a worker after this many requests (0 to disable)',
+        )
+        parser.add_argument(
+            '--max-rss-mb',
+            type=int,
+            default=settings.SERVE_MAX_RSS_MB,
+            help='Recycle a worker once its RSS exceeds this many MiB (0 to disable)',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=settings.SERVE_TIMEOUT,
+            help='Drop WSGI clients that take longer than this many seconds to send a request (0 to disable)',
+        )
+        parser.add_argument(
+            '--allow-debug',
+            action='store_true',
+            help='Start even though DEBUG is on',
+        )
+
+    def handle(self, *args, **options):
+        if settings.DEBUG and not options['allow_debug']:
+            raise CommandError(
+                "DEBUG is on, which keeps every SQL query in memory. Run with "
+                "--settings=config.settings_production (or pass --allow-debug)."
+            )
+
+        if options['interface'] == 'asgi':
+            from django.core.asgi import get_asgi_application
+            app = get_asgi_application()
+        else:
+            from django.core.wsgi import get_wsgi_application
+            app = get_wsgi_application()
+
+        try:
+            timings = warm_up()
+        except WarmupError as e:
+            raise CommandError(f"Operation validation failed: {e}")
+        self.stdout.write(f"Warmed up in {sum(s for _, s in timings) * 1000:.1f} ms")
+
+        try:
+            sock = bind_socket(options['bind'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Cannot listen on {options['bind']}: {e}")
+
+        try:
+            arbiter = Arbiter(
+                sock,
+                app,
+                interface=options['interface'],
+                workers=options['workers'] or (os.cpu_count() or 1) * 2 + 1,
+                max_requests=options['max_requests'],
+                max_rss_mb=options['max_rss_mb'],
+                shutdown_timeout=settings.SERVE_SHUTDOWN_TIMEOUT,
+                request_timeout=options['timeout'],
+                log=self.stdout.write,
+            )
+        except RuntimeError as e:
+            sock.close()
+            raise CommandError(str(e))
+
+        self.stdout.write(f"Listening on {options['bind']} (pid {os.getpid()})")
+        arbiter.run()
+        self.stdout.write(self.style.SUCCESS("Server stopped"))
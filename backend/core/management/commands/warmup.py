@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.warmup import WarmupError, profile_imports, warm_up
+
+
+class Command(BaseCommand):
+    help = 'Warm up the schema, frontend operations and DB connections and report startup cost'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            default=settings.STARTUP_BUDGET_MS,
+            help='Fail if import time plus warm-up exceeds this many milliseconds',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Number of slowest imports to report',
+        )
+        parser.add_argument(
+            '--skip-imports',
+            action='store_true',
+            help='Skip the -X importtime profile',
+        )
+
+    def handle(self, *args, **options):
+        total = 0.0
+
+        if not options['skip_imports']:
+            import_seconds, slowest = profile_imports(limit=options['top'])
+            total += import_seconds
+            self.stdout.write(f"Import time: {import_seconds * 1000:.1f} ms")
+            for module, seconds in slowest:
+                self.stdout.write(f"  {seconds * 1000:9.1f} ms  {module}")
+
+        try:
+            timings = warm_up()
+        except WarmupError as e:
+            raise CommandError(f"Operation validation failed: {e}")
+
+        self.stdout.write("Warm-up:")
+        for step, seconds in timings:
+            total += seconds
+            self.stdout.write(f"  {seconds * 1000:9.1f} ms  {step}")
+
+        budget = options['budget_ms']
+        self.stdout.write(f"Total: {total * 1000:.1f} ms (budget {budget:.0f} ms)")
+        if budget and total * 1000 > budget:
+            raise CommandError(
+                f"Startup took {total * 1000:.1f} ms, over the {budget:.0f} ms budget"
+            )
+        self.stdout.write(self.style.SUCCESS('Worker is warm'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='organization',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 20:05
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_task_organization(apps, schema_editor):
+    Project = apps.get_model('core', 'Project')
+    Task = apps.get_model('core', 'Task')
+    Task.objects.update(
+        organization=Subquery(
+            Project.objects.filter(pk=OuterRef('project_id')).values('organization_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_organization_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='organization',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.organization'),
+        ),
+        migrations.RunPython(backfill_task_organization, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='task',
+            name='organization',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to='core.organization'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'assignee_email', '-created_at', '-id'], name='core_task_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status', 'DONE'), _negated=True), fields=['organization', 'due_date', 'id'], name='core_task_overdue_idx'),
+        ),
+    ]
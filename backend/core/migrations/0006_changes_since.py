@@ -0,0 +1,70 @@
+# Generated by Django 4.2.7 on 2026-10-19 21:10
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill_comment_organization(apps, schema_editor):
+    Task = apps.get_model('core', 'Task')
+    TaskComment = apps.get_model('core', 'TaskComment')
+    TaskComment.objects.update(
+        organization=Subquery(
+            Task.objects.filter(pk=OuterRef('task_id')).values('organization_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskcomment',
+            name='organization',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.organization'),
+        ),
+        migrations.RunPython(backfill_comment_organization, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='taskcomment',
+            name='organization',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, related_name='comments', to='core.organization'),
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['organization', 'updated_at'], name='core_projec_organiz_153aaf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'updated_at'], name='core_task_organiz_515a10_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['organization', 'created_at'], name='core_taskco_organiz_7aed7d_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='organization',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='core.organization'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['organization', 'deleted_at'], name='core_tombst_organiz_52e5c9_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 20:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_changes_since'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleted_at__isnull', False)), fields=['organization'], name='core_project_hidden_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 20:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_project_deleted_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrganizationAnalytics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_projects', models.PositiveIntegerField(default=0)),
+                ('active_projects', models.PositiveIntegerField(default=0)),
+                ('completed_projects', models.PositiveIntegerField(default=0)),
+                ('total_tasks', models.PositiveIntegerField(default=0)),
+                ('todo_tasks', models.PositiveIntegerField(default=0)),
+                ('in_progress_tasks', models.PositiveIntegerField(default=0)),
+                ('completed_tasks', models.PositiveIntegerField(default=0)),
+                ('overdue_tasks', models.PositiveIntegerField(default=0)),
+                ('completion_rate', models.FloatField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('organization', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='analytics', to='core.organization')),
+            ],
+            options={
+                'verbose_name_plural': 'organization analytics',
+                'ordering': ['organization__name'],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-19 23:40
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def backfill_comment_updated_at(apps, schema_editor):
+    TaskComment = apps.get_model('core', 'TaskComment')
+    TaskComment.objects.update(updated_at=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_organization_analytics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskcomment',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_comment_updated_at, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='taskcomment',
+            name='core_taskco_organiz_7aed7d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='taskcomment',
+            index=models.Index(fields=['organization', 'updated_at'], name='core_taskco_organiz_989728_idx'),
+        ),
+    ]
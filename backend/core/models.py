@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F
+from django.utils import timezone
 from django.utils.text import slugify
 
 
@@ -7,6 +9,9 @@ class Organization(models.Model):
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, max_length=100)
     contact_email = models.EmailField()
+    # Bumped on every write to the organization's projects, tasks or comments.
+    # Used to derive cheap ETags for cached GraphQL GET responses.
+    data_version = models.PositiveBigIntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -23,6 +28,32 @@ class Organization(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def bump_data_version(cls, **filters):
+        """Increment data_version for the organizations matching filters"""
+        return cls.objects.filter(**filters).update(data_version=F('data_version') + 1)
+
+
+class VisibleProjectManager(models.Manager):
+    """Excludes projects hidden by deleteProject and awaiting purge"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class OrganizationScopedQuerySet(models.QuerySet):
+    def visible_in(self, org):
+        """Rows of org, minus those under projects awaiting purge"""
+        queryset = self.filter(organization=org)
+        hidden = list(
+            Project.all_objects.filter(organization=org, deleted_at__isnull=False)
+            .values_list('id', flat=True)
+        )
+        if not hidden:
+            return queryset
+        project_field = 'project_id' if self.model is Task else 'task__project_id'
+        return queryset.exclude(**{f'{project_field}__in': hidden})
+
 
 class Project(models.Model):
     """Project model belonging to an organization"""
@@ -45,14 +76,25 @@ class Project(models.Model):
         default='ACTIVE'
     )
     due_date = models.DateField(null=True, blank=True)
+    # Set by deleteProject; the row is purged in the background
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = VisibleProjectManager()
+    all_objects = models.Manager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['organization', 'status']),
             models.Index(fields=['organization', '-created_at']),
+            models.Index(fields=['organization', 'updated_at']),
+            models.Index(
+                fields=['organization'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='core_project_hidden_idx'
+            ),
         ]
 
     def __str__(self):
@@ -80,6 +122,13 @@ class Task(models.Model):
         on_delete=models.CASCADE,
         related_name='tasks'
     )
+    # Denormalized from project so org-wide task queries skip the project join
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='tasks',
+        editable=False
+    )
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     status = models.CharField(
@@ -92,16 +141,33 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = OrganizationScopedQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['project', 'status']),
             models.Index(fields=['project', '-created_at']),
+            models.Index(
+                fields=['organization', 'assignee_email', '-created_at', '-id'],
+                name='core_task_assignee_idx'
+            ),
+            models.Index(
+                fields=['organization', 'due_date', 'id'],
+                condition=~models.Q(status='DONE'),
+                name='core_task_overdue_idx'
+            ),
+            models.Index(fields=['organization', 'updated_at']),
         ]
 
     def __str__(self):
         return f"{self.project.name} - {self.title}"
 
+    def save(self, *args, **kwargs):
+        if self.organization_id is None:
+            self.organization_id = self.project.organization_id
+        super().save(*args, **kwargs)
+
 
 class TaskComment(models.Model):
     """Comment model for tasks"""
@@ -110,15 +176,218 @@ class TaskComment(models.Model):
         on_delete=models.CASCADE,
         related_name='comments'
     )
+    # Denormalized from task so org-wide change feeds skip the task join
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='comments',
+        editable=False
+    )
     content = models.TextField()
     author_email = models.EmailField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Change marker for changesSince; refreshed when a comment is restored
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = OrganizationScopedQuerySet.as_manager()
 
     class Meta:
         ordering = ['created_at']
         indexes = [
             models.Index(fields=['task', 'created_at']),
+            models.Index(fields=['organization', 'updated_at']),
         ]
 
     def __str__(self):
         return f"Comment by {self.author_email} on {self.task.title}"
+
+    def save(self, *args, **kwargs):
+        if self.organization_id is None:
+            self.organization_id = self.task.organization_id
+        super().save(*args, **kwargs)
+
+
+class Tombstone(models.Model):
+    """Deletion log entry used by the changesSince delta sync query"""
+    # No FK constraint: tombstones are written while an organization's rows
+    # are being deleted, possibly along with the organization itself.
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['organization', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} deleted at {self.deleted_at}"
+
+
+class ArchivedProject(models.Model):
+    """Cold copy of a completed Project moved out of the hot tables.
+
+    Primary keys are the original ids so a project can be restored as-is.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='archived_projects'
+    )
+    name = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Project.STATUS_CHOICES)
+    due_date = models.DateField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['organization', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.organization.name} - {self.name} (archived)"
+
+
+class ArchivedTask(models.Model):
+    """Cold copy of a Task belonging to an ArchivedProject"""
+    id = models.BigIntegerField(primary_key=True)
+    project = models.ForeignKey(
+        ArchivedProject,
+        on_delete=models.CASCADE,
+        related_name='tasks'
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=Task.TASK_STATUS_CHOICES)
+    assignee_email = models.EmailField(blank=True)
+    due_date = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.project.name} - {self.title} (archived)"
+
+
+class ArchivedTaskComment(models.Model):
+    """Cold copy of a TaskComment belonging to an ArchivedTask"""
+    id = models.BigIntegerField(primary_key=True)
+    task = models.ForeignKey(
+        ArchivedTask,
+        on_delete=models.CASCADE,
+        related_name='comments'
+    )
+    content = models.TextField()
+    author_email = models.EmailField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['created_at']
+
+    def __str__(self):
+        return f"Comment by {self.author_email} on {self.task.title} (archived)"
+
+
+class JobLeaseLost(Exception):
+    """The job was reclaimed by another worker while this one was running it"""
+
+
+class Job(models.Model):
+    """Background job claimed and run by `manage.py run_workers`"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('SUCCEEDED', 'Succeeded'),
+        ('FAILED', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=100)
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        null=True,
+        blank=True
+    )
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default='QUEUED'
+    )
+    progress = models.PositiveSmallIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    def report_progress(self, done, total):
+        """Record progress as a percentage of done/total and renew the lease.
+
+        Raises JobLeaseLost if another worker has since claimed the job.
+        """
+        self.progress = min(100, int(done * 100 / total)) if total else 100
+        now = timezone.now()
+        if not self.locked_by:
+            Job.objects.filter(pk=self.pk).update(progress=self.progress, updated_at=now)
+            return
+        renewed = Job.objects.filter(pk=self.pk, status='RUNNING', locked_by=self.locked_by).update(
+            progress=self.progress, locked_at=now, updated_at=now
+        )
+        if not renewed:
+            raise JobLeaseLost(f"Job {self.pk} is no longer held by {self.locked_by}")
+        self.locked_at = now
+
+
+class OrganizationAnalytics(models.Model):
+    """Per-organization row of the platform report built by `manage.py org_analytics`"""
+    organization = models.OneToOneField(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name='analytics'
+    )
+    total_projects = models.PositiveIntegerField(default=0)
+    active_projects = models.PositiveIntegerField(default=0)
+    completed_projects = models.PositiveIntegerField(default=0)
+    total_tasks = models.PositiveIntegerField(default=0)
+    todo_tasks = models.PositiveIntegerField(default=0)
+    in_progress_tasks = models.PositiveIntegerField(default=0)
+    completed_tasks = models.PositiveIntegerField(default=0)
+    overdue_tasks = models.PositiveIntegerField(default=0)
+    completion_rate = models.FloatField(default=0)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['organization__name']
+        verbose_name_plural = 'organization analytics'
+
+    def __str__(self):
+        return f"Analytics for {self.organization}"
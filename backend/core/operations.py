@@ -0,0 +1,225 @@
+"""
+GraphQL operations sent by the frontend.
+
+Mirrors frontend/src/graphql/queries.ts and mutations.ts so the backend can
+pre-validate them at startup and exercise them in tests. Keep both in sync.
+"""
+
+GET_PROJECTS = """
+  query GetProjects($organizationSlug: String!) {
+    projects(organizationSlug: $organizationSlug) {
+      id
+      name
+      description
+      status
+      dueDate
+      taskCount
+      completedTasks
+      createdAt
+      updatedAt
+    }
+  }
+"""
+
+GET_PROJECT = """
+  query GetProject($id: ID!, $organizationSlug: String!) {
+    project(id: $id, organizationSlug: $organizationSlug) {
+      id
+      name
+      description
+      status
+      dueDate
+      taskCount
+      completedTasks
+      createdAt
+      updatedAt
+    }
+  }
+"""
+
+GET_TASKS = """
+  query GetTasks($projectId: ID!, $organizationSlug: String!) {
+    tasks(projectId: $projectId, organizationSlug: $organizationSlug) {
+      id
+      title
+      description
+      status
+      assigneeEmail
+      dueDate
+      createdAt
+      updatedAt
+    }
+  }
+"""
+
+GET_PROJECT_STATS = """
+  query GetProjectStats($organizationSlug: String!) {
+    projectStats(organizationSlug: $organizationSlug) {
+      totalProjects
+      activeProjects
+      completedProjects
+      totalTasks
+      completedTasks
+      completionRate
+    }
+  }
+"""
+
+CREATE_PROJECT = """
+  mutation CreateProject(
+    $organizationSlug: String!
+    $name: String!
+    $description: String
+    $status: String
+    $dueDate: Date
+  ) {
+    createProject(
+      organizationSlug: $organizationSlug
+      name: $name
+      description: $description
+      status: $status
+      dueDate: $dueDate
+    ) {
+      success
+      errors
+      project {
+        id
+        name
+        description
+        status
+        dueDate
+        taskCount
+        completedTasks
+        createdAt
+        updatedAt
+      }
+    }
+  }
+"""
+
+UPDATE_PROJECT = """
+  mutation UpdateProject(
+    $id: ID!
+    $organizationSlug: String!
+    $name: String
+    $description: String
+    $status: String
+    $dueDate: Date
+  ) {
+    updateProject(
+      id: $id
+      organizationSlug: $organizationSlug
+      name: $name
+      description: $description
+      status: $status
+      dueDate: $dueDate
+    ) {
+      success
+      errors
+      project {
+        id
+        name
+        description
+        status
+        dueDate
+        taskCount
+        completedTasks
+        createdAt
+        updatedAt
+      }
+    }
+  }
+"""
+
+CREATE_TASK = """
+  mutation CreateTask(
+    $projectId: ID!
+    $title: String!
+    $description: String
+    $status: String
+    $assigneeEmail: String
+    $dueDate: DateTime
+  ) {
+    createTask(
+      projectId: $projectId
+      title: $title
+      description: $description
+      status: $status
+      assigneeEmail: $assigneeEmail
+      dueDate: $dueDate
+    ) {
+      success
+      errors
+      task {
+        id
+        title
+        description
+        status
+        assigneeEmail
+        dueDate
+        createdAt
+        updatedAt
+      }
+    }
+  }
+"""
+
+UPDATE_TASK = """
+  mutation UpdateTask(
+    $id: ID!
+    $title: String
+    $description: String
+    $status: String
+    $assigneeEmail: String
+    $dueDate: DateTime
+  ) {
+    updateTask(
+      id: $id
+      title: $title
+      description: $description
+      status: $status
+      assigneeEmail: $assigneeEmail
+      dueDate: $dueDate
+    ) {
+      success
+      errors
+      task {
+        id
+        title
+        description
+        status
+        assigneeEmail
+        dueDate
+        createdAt
+        updatedAt
+      }
+    }
+  }
+"""
+
+ADD_COMMENT = """
+  mutation AddComment($taskId: ID!, $content: String!, $authorEmail: String!) {
+    addComment(taskId: $taskId, content: $content, authorEmail: $authorEmail) {
+      success
+      errors
+      comment {
+        id
+        content
+        authorEmail
+        createdAt
+      }
+    }
+  }
+"""
+
+FRONTEND_OPERATIONS = {
+    'GetProjects': GET_PROJECTS,
+    'GetProject': GET_PROJECT,
+    'GetTasks': GET_TASKS,
+    'GetProjectStats': GET_PROJECT_STATS,
+    'CreateProject': CREATE_PROJECT,
+    'UpdateProject': UPDATE_PROJECT,
+    'CreateTask': CREATE_TASK,
+    'UpdateTask': UPDATE_TASK,
+    'AddComment': ADD_COMMENT,
+}
@@ -0,0 +1,237 @@
+"""
+On-demand profiling of GraphQL requests.
+
+A request to /graphql/ is profiled when it carries the
+``X-GraphQL-Profile`` header with the configured token, or when it is
+picked by ``GRAPHQL_PROFILING['SAMPLE_RATE']``. Profiled requests run under
+cProfile with a stack sampler alongside, and every SQL statement is timed.
+The artifacts are written to ``DIRECTORY/<operation name>/``:
+
+* ``<id>.prof``: cProfile stats, for ``python -m pstats`` or snakeviz
+* ``<id>.collapsed``: sampled stacks in the collapsed format read by
+  flamegraph.pl and speedscope
+* ``<id>.json``: total and SQL time and the SQL statements with timings
+
+Only the newest ``KEEP`` profiles of each operation are kept; older ones are
+deleted whenever a new one is saved. Operation names come from the client,
+so once ``MAX_OPERATIONS`` folders exist, profiles of operations without
+one are saved under ``anonymous``.
+
+Requests that aren't profiled pay for one header lookup and, with a
+non-zero sample rate, one random() call.
+"""
+
+import cProfile
+import hmac
+import itertools
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .ratelimit import ReleaseOnClose
+
+DEFAULTS = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 0.0,
+    'TOKEN': '',
+    'DIRECTORY': 'profiles',
+    'SAMPLE_INTERVAL': 0.001,
+    'KEEP': 100,
+    'MAX_OPERATIONS': 200,
+}
+
+HEADER = 'HTTP_X_GRAPHQL_PROFILE'
+ARTIFACTS = ('.prof', '.collapsed', '.json')
+
+_sequence = itertools.count(1)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'GRAPHQL_PROFILING', {})}
+
+
+def should_profile(request):
+    """Return 'header' or 'sample' if this request should be profiled, else None"""
+    config = get_config()
+    if not config['ENABLED']:
+        return None
+    token = request.META.get(HEADER)
+    # compare_digest() raises TypeError for str with non-ASCII characters
+    if token is not None and config['TOKEN'] and hmac.compare_digest(
+            token.encode('latin-1', 'replace'), config['TOKEN'].encode()):
+        return 'header'
+    if config['SAMPLE_RATE'] and random.random() < config['SAMPLE_RATE']:
+        return 'sample'
+    return None
+
+
+class StackSampler(threading.Thread):
+    """Periodically record the call stack of one thread"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='graphql-profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename.rsplit('site-packages' + os.sep, 1)[-1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+class ProfileSession:
+    """Profile the current thread and time its SQL until stop() is called"""
+
+    def __init__(self, config):
+        self.config = config
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), config['SAMPLE_INTERVAL'])
+        self.queries = []
+        self.stack = ExitStack()
+        self.profile_id = '%s-%d-%d' % (
+            timezone.now().strftime('%Y%m%dT%H%M%S'), os.getpid(), next(_sequence)
+        )
+
+    def start(self):
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self.time_query))
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profiler.enable()
+
+    def stop(self):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        self.sampler.stop()
+        self.stack.close()
+
+    def time_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'many': many,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+    def save(self, operation_name, trigger):
+        """Write the artifacts to DIRECTORY/<operation_name>/<profile_id>.*"""
+        directory = os.path.join(self.config['DIRECTORY'], operation_name)
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.profile_id)
+
+        self.profiler.dump_stats(base + '.prof')
+        with open(base + '.collapsed', 'w') as f:
+            for stack, count in self.sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(base + '.json', 'w') as f:
+            json.dump({
+                'operation': operation_name,
+                'trigger': trigger,
+                'duration_ms': round(self.duration * 1000, 3),
+                'sql_time_ms': round(sum(q['duration_ms'] for q in self.queries), 3),
+                'query_count': len(self.queries),
+                'queries': self.queries,
+            }, f, indent=2)
+        self.prune(directory)
+
+    def prune(self, directory):
+        """Delete all but the newest KEEP profiles in directory"""
+        keep = self.config['KEEP']
+        if not keep:
+            return
+        saved = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                profile_id, extension = os.path.splitext(entry.name)
+                if extension not in ARTIFACTS or profile_id == self.profile_id:
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                saved[profile_id] = max(saved.get(profile_id, 0), mtime)
+
+        # The profile just saved counts towards keep
+        excess = len(saved) - (keep - 1)
+        oldest = sorted(saved, key=lambda profile_id: (saved[profile_id], profile_id))
+        for profile_id in oldest[:max(0, excess)]:
+            for extension in ARTIFACTS:
+                try:
+                    os.remove(os.path.join(directory, profile_id + extension))
+                except FileNotFoundError:
+                    # Pruned by another worker
+                    pass
+
+
+def operation_folder(config, operation_name):
+    """Return the folder name for operation_name, 'anonymous' if there is no room"""
+    operation_name = re.sub(r'[^\w-]', '_', operation_name or 'anonymous')
+    limit = config['MAX_OPERATIONS']
+    if not limit or os.path.isdir(os.path.join(config['DIRECTORY'], operation_name)):
+        return operation_name
+    try:
+        with os.scandir(config['DIRECTORY']) as entries:
+            count = sum(entry.is_dir() for entry in entries)
+    except FileNotFoundError:
+        count = 0
+    return operation_name if count < limit else 'anonymous'
+
+
+def profile_response(get_response, operation_name, trigger):
+    """Call get_response() under a ProfileSession and save the artifacts.
+
+    For streaming responses profiling continues until the response is
+    closed, so the streamed payloads are included.
+    """
+    config = get_config()
+    session = ProfileSession(config)
+    operation_name = operation_folder(config, operation_name)
+
+    def finish():
+        session.stop()
+        session.save(operation_name, trigger)
+
+    session.start()
+    try:
+        response = get_response()
+    except BaseException:
+        finish()
+        raise
+    if response.streaming:
+        response.streaming_content = ReleaseOnClose(response.streaming_content, finish)
+    else:
+        finish()
+    if trigger == 'header':
+        response['X-GraphQL-Profile-Id'] = f"{operation_name}/{session.profile_id}"
+    return response
@@ -0,0 +1,128 @@
+"""
+Fast-path deletion of projects and tasks.
+
+Django's delete() collects every related row into memory and sends a
+signal per object before deleting. For a project with many tasks that
+means huge memory use and long-held locks. Instead, hide_project() marks
+the project deleted (so the visible managers drop it immediately) and
+queues a ``purge_project`` job, which removes comments, then tasks, then
+the project with bounded raw DELETEs, each batch in its own transaction.
+
+Purges write tombstones for the delta sync feed and bump the
+organization's data_version like the signal handlers would.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.utils import timezone
+
+from .models import Organization, Project, Task, TaskComment, Tombstone
+
+
+def hide_project(project):
+    """Hide a project immediately and queue the purge of its rows"""
+    from .jobs import enqueue
+
+    with transaction.atomic():
+        Project.all_objects.filter(pk=project.pk).update(deleted_at=timezone.now())
+        Tombstone.objects.bulk_create(tombstones(project.organization_id, 'Project', [project]))
+        Organization.bump_data_version(pk=project.organization_id)
+        return enqueue(
+            'purge_project',
+            organization=project.organization,
+            payload={'project_id': project.pk},
+        )
+
+
+def purge_project(project_id, organization_id, batch_size=None, progress=None):
+    """Delete a project's comments, tasks and finally the project in batches.
+
+    Only projects of organization_id that hide_project() has hidden are
+    purged; for anything else this does nothing and returns 0.
+
+    progress, if given, is called with (tasks_deleted, total_tasks) after
+    each batch of tasks. Returns the number of tasks deleted.
+    """
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    project = Project.all_objects.filter(
+        pk=project_id, organization_id=organization_id, deleted_at__isnull=False
+    ).first()
+    if project is None:
+        return 0
+
+    total = Task.objects.filter(project_id=project_id).count()
+    deleted = 0
+    while True:
+        task_ids = list(
+            Task.objects.filter(project_id=project_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not task_ids:
+            break
+        _purge_comments(project.organization_id, task_ids, batch_size)
+        with transaction.atomic():
+            raw_delete(Task.objects.filter(pk__in=task_ids))
+            Tombstone.objects.bulk_create(tombstones(project.organization_id, 'Task', task_ids))
+            Organization.bump_data_version(pk=project.organization_id)
+        deleted += len(task_ids)
+        if progress is not None:
+            progress(deleted, total)
+
+    with transaction.atomic():
+        raw_delete(Project.all_objects.filter(pk=project_id))
+        Organization.bump_data_version(pk=project.organization_id)
+    return deleted
+
+
+def purge_task(task, batch_size=None):
+    """Delete a task and its comments, comments in bounded batches"""
+    batch_size = batch_size or settings.PURGE_BATCH_SIZE
+    _purge_comments(task.organization_id, [task.pk], batch_size)
+    with transaction.atomic():
+        raw_delete(Task.objects.filter(pk=task.pk))
+        Tombstone.objects.bulk_create(tombstones(task.organization_id, 'Task', [task.pk]))
+        Organization.bump_data_version(pk=task.organization_id)
+
+
+def _purge_comments(organization_id, task_ids, batch_size):
+    while True:
+        with transaction.atomic():
+            comment_ids = list(
+                TaskComment.objects.filter(task_id__in=task_ids)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not comment_ids:
+                return
+            raw_delete(TaskComment.objects.filter(pk__in=comment_ids))
+            Tombstone.objects.bulk_create(tombstones(organization_id, 'TaskComment', comment_ids))
+
+
+def prune_tombstones():
+    """Delete tombstones older than CHANGES_TOMBSTONE_RETENTION_DAYS.
+
+    Clients whose cursor predates the window are told to resync instead.
+    Returns the number of tombstones deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=settings.CHANGES_TOMBSTONE_RETENTION_DAYS)
+    return raw_delete(Tombstone.objects.filter(deleted_at__lt=cutoff))
+
+
+def tombstones(organization_id, model, rows):
+    """Build Tombstone rows for model instances or primary keys"""
+    return [
+        Tombstone(organization_id=organization_id, model=model, object_id=getattr(row, 'pk', row))
+        for row in rows
+    ]
+
+
+def raw_delete(queryset):
+    """Delete rows with a single DELETE, skipping the collector and signals.
+
+    Callers delete children before parents and record tombstones and bump
+    data_version themselves.
+    """
+    return queryset._raw_delete(router.db_for_write(queryset.model))
@@ -0,0 +1,418 @@
+"""
+Per-organization admission control for the GraphQL endpoint.
+
+RateLimitMiddleware charges every request to /graphql/ against two token
+buckets, one for the organization and one for the client address. The
+organization comes from the ``organizationSlug``, ``projectId`` or ``taskId``
+argument of the root fields (``id`` for updateTask), resolved with a cached
+lookup; requests naming an organization, project or task that doesn't exist
+only pay the client bucket. Mutations cost more tokens than queries. It also
+caps the number of in-flight requests per organization. Rejected requests
+get a 429 with ``Retry-After``.
+
+Bucket state lives in a pluggable store (``GRAPHQL_RATE_LIMIT['STORE']``):
+LocalMemoryStore keeps it per process, CacheStore shares it between
+processes through Django's cache framework.
+"""
+
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+from graphql import (
+    IntValueNode,
+    OperationType,
+    StringValueNode,
+    VariableNode,
+    get_operation_ast,
+    parse,
+)
+
+from .models import Organization, Project, Task
+
+DEFAULTS = {
+    'ENABLED': True,
+    'PATH': '/graphql/',
+    'STORE': 'core.ratelimit.LocalMemoryStore',
+    'CACHE_ALIAS': 'default',
+    'ORG_RATE': 50.0,
+    'ORG_BURST': 200,
+    'CLIENT_RATE': 20.0,
+    'CLIENT_BURST': 100,
+    'QUERY_COST': 1,
+    'MUTATION_COST': 5,
+    'MAX_CONCURRENT_PER_ORG': 10,
+    'TRUST_X_FORWARDED_FOR': False,
+    # LocalMemoryStore keeps at most this many buckets, evicting the least
+    # recently used, and as many cached organization lookups
+    'MAX_ENTRIES': 10000,
+    'OWNER_CACHE_TIMEOUT': 300,
+}
+
+# Root field arguments naming the organization a request acts on, most
+# specific first, and the lookup that maps their value to its id
+OWNER_ARGUMENTS = ('organizationSlug', 'projectId', 'taskId')
+OWNER_LOOKUPS = {
+    'organizationSlug': lambda slug: Organization.objects.filter(slug=slug).values_list('id', flat=True),
+    'projectId': lambda id: Project.all_objects.filter(id=id).values_list('organization_id', flat=True),
+    'taskId': lambda id: Task.objects.filter(id=id).values_list('organization_id', flat=True),
+}
+# Root fields whose ``id`` argument is a task id
+TASK_ID_FIELDS = {'updateTask'}
+
+SLUG_RE = re.compile(r'^[-\w]{1,100}$', re.ASCII)
+ID_RE = re.compile(r'^\d{1,18}$', re.ASCII)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'GRAPHQL_RATE_LIMIT', {})}
+
+
+class LocalMemoryStore:
+    """In-process store. Limits apply per worker process."""
+
+    def __init__(self, config):
+        self.lock = threading.Lock()
+        self.max_entries = config['MAX_ENTRIES']
+        self.buckets = OrderedDict()
+        self.owners = OrderedDict()
+        self.in_flight = Counter()
+        self.counters = Counter()
+
+    def _trim(self, entries):
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def take(self, buckets):
+        """Atomically take cost tokens from every bucket, or from none.
+
+        buckets is a list of ``(key, cost, rate, burst)``. Returns
+        ``(0, None)`` when the request is admitted, otherwise the seconds
+        until it would be and the key of the most limiting bucket.
+        """
+        now = time.monotonic()
+        with self.lock:
+            refilled = []
+            retry_after, rejected = 0, None
+            for key, cost, rate, burst in buckets:
+                tokens, last = self.buckets.get(key, (burst, now))
+                tokens = min(burst, tokens + (now - last) * rate)
+                cost = min(cost, burst)
+                if tokens < cost and (cost - tokens) / rate > retry_after:
+                    retry_after, rejected = (cost - tokens) / rate, key
+                refilled.append((key, tokens, cost))
+            for key, tokens, cost in refilled:
+                self.buckets[key] = (tokens if rejected else tokens - cost, now)
+                self.buckets.move_to_end(key)
+            # An evicted bucket comes back full, which is what an idle one refills to anyway
+            self._trim(self.buckets)
+            return retry_after, rejected
+
+    def get_owner(self, key):
+        """Return the cached organization id for key (0 if it has none), or None"""
+        with self.lock:
+            organization_id, expires = self.owners.get(key, (None, 0))
+            if expires < time.monotonic():
+                return None
+            self.owners.move_to_end(key)
+            return organization_id
+
+    def set_owner(self, key, organization_id, timeout):
+        with self.lock:
+            self.owners[key] = (organization_id, time.monotonic() + timeout)
+            self.owners.move_to_end(key)
+            self._trim(self.owners)
+
+    def acquire(self, key, limit):
+        with self.lock:
+            if self.in_flight[key] >= limit:
+                return False
+            self.in_flight[key] += 1
+            return True
+
+    def release(self, key):
+        with self.lock:
+            self.in_flight[key] -= 1
+            if self.in_flight[key] <= 0:
+                del self.in_flight[key]
+
+    def incr_counter(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def get_counters(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+class CacheStore:
+    """Store shared through a Django cache, e.g. Redis or memcached.
+
+    Counters are updated with atomic incr/decr; bucket refills use
+    get/set and can over-admit slightly under heavy contention.
+    """
+
+    prefix = 'graphql-ratelimit'
+
+    def __init__(self, config):
+        self.cache = caches[config['CACHE_ALIAS']]
+
+    def take(self, buckets):
+        now = time.time()
+        keys = [f"{self.prefix}:bucket:{key}" for key, *_ in buckets]
+        state = self.cache.get_many(keys)
+        updated = {}
+        retry_after, rejected = 0, None
+        for cache_key, (key, cost, rate, burst) in zip(keys, buckets):
+            tokens, last = state.get(cache_key, (burst, now))
+            tokens = min(burst, tokens + (now - last) * rate)
+            cost = min(cost, burst)
+            if tokens < cost and (cost - tokens) / rate > retry_after:
+                retry_after, rejected = (cost - tokens) / rate, key
+            updated[cache_key] = (tokens - cost, now)
+        if rejected is None:
+            self.cache.set_many(updated, timeout=3600)
+        return retry_after, rejected
+
+    def acquire(self, key, limit):
+        cache_key = f"{self.prefix}:inflight:{key}"
+        self.cache.add(cache_key, 0, timeout=3600)
+        if self.cache.incr(cache_key) > limit:
+            self.cache.decr(cache_key)
+            return False
+        return True
+
+    def release(self, key):
+        self.cache.decr(f"{self.prefix}:inflight:{key}")
+
+    def get_owner(self, key):
+        return self.cache.get(f"{self.prefix}:owner:{key}")
+
+    def set_owner(self, key, organization_id, timeout):
+        self.cache.set(f"{self.prefix}:owner:{key}", organization_id, timeout)
+
+    def incr_counter(self, name):
+        cache_key = f"{self.prefix}:counter:{name}"
+        self.cache.add(cache_key, 0, timeout=None)
+        self.cache.incr(cache_key)
+
+    def get_counters(self):
+        names = ('org', 'client', 'concurrency')
+        values = self.cache.get_many([f"{self.prefix}:counter:{name}" for name in names])
+        return {
+            name: values[f"{self.prefix}:counter:{name}"]
+            for name in names
+            if f"{self.prefix}:counter:{name}" in values
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            config = get_config()
+            _store = import_string(config['STORE'])(config)
+        return _store
+
+
+def reset_store():
+    """Drop the current store so the next request builds a new one (tests)"""
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def describe_request(request):
+    """Return ``(owner, is_mutation, root_field_count)`` for a GraphQL request.
+
+    owner is ``(argument, value)`` for the first of OWNER_ARGUMENTS found
+    among the root fields' arguments, inline or through variables, or None.
+    """
+    if request.method == 'GET':
+        query = request.GET.get('query')
+        variables = request.GET.get('variables')
+        operation_name = request.GET.get('operationName')
+    else:
+        content_type = request.META.get('CONTENT_TYPE', '').split(';', 1)[0].lower()
+        if content_type == 'application/graphql':
+            data = {'query': request.body.decode('utf-8', 'replace')}
+        elif content_type == 'application/json':
+            try:
+                data = json.loads(request.body)
+            except ValueError:
+                data = {}
+        else:
+            data = request.POST
+        if not isinstance(data, dict):
+            data = {}
+        query = data.get('query')
+        variables = data.get('variables')
+        operation_name = data.get('operationName')
+
+    if isinstance(variables, str):
+        try:
+            variables = json.loads(variables)
+        except ValueError:
+            variables = None
+    if not isinstance(variables, dict):
+        variables = {}
+
+    arguments = {}
+    is_mutation = False
+    root_fields = 1
+
+    if isinstance(query, str):
+        try:
+            operation = get_operation_ast(parse(query), operation_name)
+        except Exception:
+            operation = None
+        if operation is not None:
+            is_mutation = operation.operation == OperationType.MUTATION
+            selections = operation.selection_set.selections
+            root_fields = max(1, len(selections))
+            arguments = _root_arguments(selections, variables)
+    if not arguments:
+        # Unparseable document: go by the conventional variable names
+        arguments = variables
+
+    for name in OWNER_ARGUMENTS:
+        if arguments.get(name) is not None:
+            return (name, arguments[name]), is_mutation, root_fields
+    return None, is_mutation, root_fields
+
+
+def _root_arguments(selections, variables):
+    """Map argument names to values across the root fields, first one wins"""
+    arguments = {}
+    for selection in selections:
+        for argument in getattr(selection, 'arguments', None) or ():
+            node = argument.value
+            if isinstance(node, VariableNode):
+                value = variables.get(node.name.value)
+            elif isinstance(node, (StringValueNode, IntValueNode)):
+                value = node.value
+            else:
+                continue
+            name = argument.name.value
+            if name == 'id' and selection.name.value in TASK_ID_FIELDS:
+                name = 'taskId'
+            arguments.setdefault(name, value)
+    return arguments
+
+
+def resolve_organization(store, owner, config):
+    """Return the id of the organization owner points at, or None.
+
+    Lookups are cached in the store, misses included. Malformed values are
+    never looked up.
+    """
+    if owner is None:
+        return None
+    name, value = owner
+    if isinstance(value, int) and not isinstance(value, bool):
+        value = str(value)
+    pattern = SLUG_RE if name == 'organizationSlug' else ID_RE
+    if not isinstance(value, str) or not pattern.match(value):
+        return None
+
+    key = f"{name}:{value}"
+    organization_id = store.get_owner(key)
+    if organization_id is None:
+        organization_id = OWNER_LOOKUPS[name](value).first() or 0
+        store.set_owner(key, organization_id, config['OWNER_CACHE_TIMEOUT'])
+    return organization_id or None
+
+
+def get_client_id(request, config):
+    if config['TRUST_X_FORWARDED_FOR']:
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+def too_many_requests(retry_after, message):
+    response = JsonResponse({'errors': [{'message': message}]}, status=429)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class ReleaseOnClose:
+    """Streaming body wrapper that calls release() once, when the response is closed"""
+
+    def __init__(self, content, release):
+        self.content = content
+        self.release = release
+
+    def __iter__(self):
+        return iter(self.content)
+
+    def close(self):
+        release, self.release = self.release, None
+        if release is not None:
+            release()
+
+
+class RateLimitMiddleware:
+    """Token-bucket rate limiting and concurrency caps for /graphql/"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = get_config()
+        if not config['ENABLED'] or request.path != config['PATH'] or request.method not in ('GET', 'POST'):
+            return self.get_response(request)
+
+        store = get_store()
+        owner, is_mutation, root_fields = describe_request(request)
+        organization_id = resolve_organization(store, owner, config)
+        cost = (config['MUTATION_COST'] if is_mutation else config['QUERY_COST']) * root_fields
+
+        client_bucket = (
+            f"client:{get_client_id(request, config)}", cost,
+            config['CLIENT_RATE'], config['CLIENT_BURST'],
+        )
+        buckets = [client_bucket]
+        if organization_id:
+            buckets.append((
+                f"org:{organization_id}", cost,
+                config['ORG_RATE'], config['ORG_BURST'],
+            ))
+
+        retry_after, rejected = store.take(buckets)
+        if rejected is not None:
+            store.incr_counter(rejected.split(':', 1)[0])
+            return too_many_requests(retry_after, "Rate limit exceeded")
+
+        if not organization_id:
+            return self.get_response(request)
+
+        concurrency_key = f"org:{organization_id}"
+        if not store.acquire(concurrency_key, config['MAX_CONCURRENT_PER_ORG']):
+            store.incr_counter('concurrency')
+            return too_many_requests(1, "Too many concurrent requests for this organization")
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            store.release(concurrency_key)
+            raise
+        if response.streaming:
+            # Streamed bodies are produced after we return; hold the slot until then
+            response.streaming_content = ReleaseOnClose(
+                response.streaming_content, lambda: store.release(concurrency_key)
+            )
+        else:
+            store.release(concurrency_key)
+        return response
@@ -1,7 +1,68 @@
+import base64
+import json
+from datetime import timedelta
+
 import graphene
 from graphene_django import DjangoObjectType
-from django.db.models import Count, Q
-from .models import Organization, Project, Task, TaskComment
+from django.conf import settings
+from django.db.models import Count, F, Prefetch, Q, QuerySet, Window, prefetch_related_objects
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from graphql import FieldNode, FragmentSpreadNode, GraphQLInt, specified_directives, value_from_ast
+from .archive import restore_project
+from .incremental import INCREMENTAL_DIRECTIVES
+from .jobs import enqueue
+from .models import ArchivedProject, Job, Organization, Project, Task, TaskComment, Tombstone
+from .purge import hide_project, purge_task
+from .stats import compute_project_stats
+
+MAX_PAGE_SIZE = 100
+LATEST_COMMENTS_DEFAULT = 3
+
+
+def encode_cursor(*values):
+    """Encode keyset values into an opaque pagination cursor"""
+    payload = json.dumps([v.isoformat() if hasattr(v, 'isoformat') else v for v in values])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, or raise ValueError"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def paginate(queryset, first, after, cursor_fields):
+    """Keyset-paginate an ordered queryset.
+
+    cursor_fields is a list of (field, descending) pairs matching the
+    queryset's ordering; the last one must be unique (normally the id).
+    Returns ``(rows, end_cursor, has_next_page)``.
+    """
+    if after:
+        values = decode_cursor(after)
+        if len(values) != len(cursor_fields):
+            raise ValueError("Invalid cursor")
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y), per sort direction
+        condition = Q()
+        for i, (field, descending) in enumerate(cursor_fields):
+            step = Q(**{f"{field}__{'lt' if descending else 'gt'}": values[i]})
+            for j, (prev_field, _) in enumerate(cursor_fields[:i]):
+                step &= Q(**{prev_field: values[j]})
+            condition |= step
+        queryset = queryset.filter(condition)
+
+    first = max(1, min(first, MAX_PAGE_SIZE))
+    rows = list(queryset[:first + 1])
+    has_next_page = len(rows) > first
+    rows = rows[:first]
+    end_cursor = None
+    if rows:
+        end_cursor = encode_cursor(*(getattr(rows[-1], field) for field, _ in cursor_fields))
+    return rows, end_cursor, has_next_page
 
 
 # GraphQL Types
@@ -14,30 +75,149 @@ class OrganizationType(DjangoObjectType):
 class ProjectType(DjangoObjectType):
     task_count = graphene.Int()
     completed_tasks = graphene.Int()
+    archived = graphene.Boolean()
 
     class Meta:
         model = Project
         fields = ('id', 'organization', 'name', 'description', 'status', 
                   'due_date', 'created_at', 'updated_at')
 
+    @classmethod
+    def is_type_of(cls, root, info):
+        # Archived projects share the Project fields and a `tasks` relation
+        return isinstance(root, (Project, ArchivedProject))
+
+    def resolve_archived(self, info):
+        return isinstance(self, ArchivedProject)
+
     def resolve_task_count(self, info):
+        if hasattr(self, 'annotated_task_count'):
+            return self.annotated_task_count
         return self.tasks.count()
 
     def resolve_completed_tasks(self, info):
+        if hasattr(self, 'annotated_completed_tasks'):
+            return self.annotated_completed_tasks
         return self.tasks.filter(status='DONE').count()
 
 
+def with_task_counts(queryset):
+    """Annotate projects with the counts ProjectType would otherwise query per row"""
+    return queryset.annotate(
+        annotated_task_count=Count('tasks'),
+        annotated_completed_tasks=Count('tasks', filter=Q(tasks__status='DONE')),
+    )
+
+
 class TaskType(DjangoObjectType):
+    comment_count = graphene.Int()
+    latest_comments = graphene.List(
+        lambda: TaskCommentType,
+        n=graphene.Int(default_value=LATEST_COMMENTS_DEFAULT)
+    )
+    comments = graphene.Field(
+        lambda: CommentPageType,
+        first=graphene.Int(default_value=50),
+        after=graphene.String()
+    )
+
     class Meta:
         model = Task
         fields = ('id', 'project', 'title', 'description', 'status', 
                   'assignee_email', 'due_date', 'created_at', 'updated_at')
 
+    # comment_preview is set by with_comment_previews(); without it
+    # (e.g. a single task returned by a mutation) fall back to queries.
+    def resolve_comment_count(self, info):
+        if hasattr(self, 'comment_preview'):
+            return self.comment_preview[0].thread_size if self.comment_preview else 0
+        return self.comments.count()
+
+    def resolve_latest_comments(self, info, n=LATEST_COMMENTS_DEFAULT):
+        n = max(0, min(n, MAX_PAGE_SIZE))
+        if hasattr(self, 'comment_preview'):
+            return self.comment_preview[:n]
+        return list(self.comments.order_by('-created_at', '-id')[:n])
+
+    def resolve_comments(self, info, first=50, after=None):
+        rows, end_cursor, has_next_page = paginate(
+            self.comments.order_by('created_at', 'id'), first, after,
+            [('created_at', False), ('id', False)]
+        )
+        return CommentPageType(comments=rows, end_cursor=end_cursor, has_next_page=has_next_page)
+
+
+def requested_comment_preview(info):
+    """Return how many latest comments the selection under info asks for.
+
+    That is the largest ``latestComments(n)``, 0 if only ``commentCount``
+    is selected, or None if neither is.
+    """
+    requested = None
+    selection_sets = [node.selection_set for node in info.field_nodes if node.selection_set]
+    visited = set()
+    while selection_sets:
+        for selection in selection_sets.pop().selections:
+            if isinstance(selection, FragmentSpreadNode):
+                if selection.name.value not in visited:
+                    visited.add(selection.name.value)
+                    selection_sets.append(info.fragments[selection.name.value].selection_set)
+                continue
+            if selection.selection_set:
+                selection_sets.append(selection.selection_set)
+            if not isinstance(selection, FieldNode):
+                continue
+            if selection.name.value == 'commentCount':
+                requested = max(requested or 0, 0)
+            elif selection.name.value == 'latestComments':
+                n = LATEST_COMMENTS_DEFAULT
+                for argument in selection.arguments:
+                    if argument.name.value == 'n':
+                        n = value_from_ast(argument.value, GraphQLInt, info.variable_values)
+                        if n is None:
+                            n = LATEST_COMMENTS_DEFAULT
+                requested = max(requested or 0, min(n, MAX_PAGE_SIZE))
+    return requested
+
+
+def with_comment_previews(tasks, info):
+    """Load commentCount and latestComments for all tasks with one windowed query.
+
+    Each task gets a ``comment_preview`` list of its newest comments, each
+    annotated with the thread's size, read through the (task, created_at)
+    index. Accepts a queryset or a list of tasks.
+    """
+    n = requested_comment_preview(info)
+    if n is None:
+        return tasks
+    newest_first = (F('created_at').desc(), F('id').desc())
+    latest = (
+        TaskComment.objects.annotate(
+            position=Window(RowNumber(), partition_by=F('task_id'), order_by=newest_first),
+            thread_size=Window(Count('id'), partition_by=F('task_id')),
+        )
+        # One row per task is still needed to carry thread_size
+        .filter(position__lte=max(n, 1))
+        .order_by('task_id', 'position')
+    )
+    prefetch = Prefetch('comments', queryset=latest, to_attr='comment_preview')
+    if isinstance(tasks, QuerySet):
+        return tasks.prefetch_related(prefetch)
+    prefetch_related_objects(tasks, prefetch)
+    return tasks
+
 
 class TaskCommentType(DjangoObjectType):
     class Meta:
         model = TaskComment
-        fields = ('id', 'task', 'content', 'author_email', 'created_at')
+        fields = ('id', 'task', 'content', 'author_email', 'created_at', 'updated_at')
+
+
+class JobType(DjangoObjectType):
+    class Meta:
+        model = Job
+        fields = ('id', 'kind', 'status', 'progress', 'result', 'error',
+                  'attempts', 'max_attempts', 'created_at', 'updated_at')
 
 
 # Project Statistics Type
@@ -50,11 +230,41 @@ class ProjectStatsType(graphene.ObjectType):
     completion_rate = graphene.Float()
 
 
+# Keyset-paginated task list
+class TaskPageType(graphene.ObjectType):
+    tasks = graphene.List(TaskType)
+    end_cursor = graphene.String()
+    has_next_page = graphene.Boolean()
+
+
+class CommentPageType(graphene.ObjectType):
+    comments = graphene.List(TaskCommentType)
+    end_cursor = graphene.String()
+    has_next_page = graphene.Boolean()
+
+
+# Delta sync
+class DeletedObjectType(graphene.ObjectType):
+    model = graphene.String()
+    id = graphene.ID()
+    deleted_at = graphene.DateTime()
+
+
+class ChangeSetType(graphene.ObjectType):
+    projects = graphene.List(ProjectType)
+    tasks = graphene.List(TaskType)
+    comments = graphene.List(TaskCommentType)
+    deleted = graphene.List(DeletedObjectType)
+    cursor = graphene.String()
+    resync_required = graphene.Boolean()
+
+
 # Queries
 class Query(graphene.ObjectType):
     projects = graphene.List(
         ProjectType,
-        organization_slug=graphene.String(required=True)
+        organization_slug=graphene.String(required=True),
+        include_archived=graphene.Boolean(default_value=False)
     )
     project = graphene.Field(
         ProjectType,
@@ -70,18 +280,51 @@ class Query(graphene.ObjectType):
         ProjectStatsType,
         organization_slug=graphene.String(required=True)
     )
+    changes_since = graphene.Field(
+        ChangeSetType,
+        organization_slug=graphene.String(required=True),
+        cursor=graphene.String()
+    )
+    job_status = graphene.Field(
+        JobType,
+        id=graphene.ID(required=True),
+        organization_slug=graphene.String()
+    )
+    tasks_by_assignee = graphene.Field(
+        TaskPageType,
+        organization_slug=graphene.String(required=True),
+        email=graphene.String(required=True),
+        status=graphene.String(),
+        first=graphene.Int(default_value=50),
+        after=graphene.String()
+    )
+    overdue_tasks = graphene.Field(
+        TaskPageType,
+        organization_slug=graphene.String(required=True),
+        before=graphene.DateTime(),
+        first=graphene.Int(default_value=50),
+        after=graphene.String()
+    )
 
-    def resolve_projects(self, info, organization_slug):
+    def resolve_projects(self, info, organization_slug, include_archived=False):
         try:
             org = Organization.objects.get(slug=organization_slug)
-            return Project.objects.filter(organization=org).prefetch_related('tasks')
+            projects = with_task_counts(Project.objects.filter(organization=org))
+            if not include_archived:
+                return projects
+            archived = with_task_counts(ArchivedProject.objects.filter(organization=org))
+            return sorted(
+                [*projects, *archived],
+                key=lambda project: project.created_at,
+                reverse=True
+            )
         except Organization.DoesNotExist:
             return []
 
     def resolve_project(self, info, id, organization_slug):
         try:
             org = Organization.objects.get(slug=organization_slug)
-            return Project.objects.prefetch_related('tasks').get(
+            return with_task_counts(Project.objects.all()).get(
                 id=id,
                 organization=org
             )
@@ -92,36 +335,106 @@ class Query(graphene.ObjectType):
         try:
             org = Organization.objects.get(slug=organization_slug)
             project = Project.objects.get(id=project_id, organization=org)
-            return Task.objects.filter(project=project).prefetch_related('comments')
+            return with_comment_previews(Task.objects.filter(project=project), info)
         except (Organization.DoesNotExist, Project.DoesNotExist):
             return []
 
     def resolve_project_stats(self, info, organization_slug):
         try:
             org = Organization.objects.get(slug=organization_slug)
-            projects = Project.objects.filter(organization=org)
-            
-            total_projects = projects.count()
-            active_projects = projects.filter(status='ACTIVE').count()
-            completed_projects = projects.filter(status='COMPLETED').count()
-            
-            tasks = Task.objects.filter(project__organization=org)
-            total_tasks = tasks.count()
-            completed_tasks = tasks.filter(status='DONE').count()
-            
-            completion_rate = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-            
-            return ProjectStatsType(
-                total_projects=total_projects,
-                active_projects=active_projects,
-                completed_projects=completed_projects,
-                total_tasks=total_tasks,
-                completed_tasks=completed_tasks,
-                completion_rate=completion_rate
-            )
+            return ProjectStatsType(**compute_project_stats(org))
+        except Organization.DoesNotExist:
+            return None
+
+    def resolve_changes_since(self, info, organization_slug, cursor=None):
+        try:
+            org = Organization.objects.get(slug=organization_slug)
         except Organization.DoesNotExist:
             return None
 
+        now = timezone.now()
+        # Rows committed late with an earlier timestamp are picked up on the
+        # next call because the new watermark trails now by a safety margin.
+        new_cursor = encode_cursor(now - timedelta(seconds=settings.CHANGES_SAFETY_MARGIN))
+
+        projects = Project.objects.filter(organization=org)
+        tasks = with_comment_previews(Task.objects.visible_in(org), info)
+        comments = TaskComment.objects.visible_in(org)
+
+        if cursor is None:
+            return ChangeSetType(
+                projects=projects, tasks=tasks, comments=comments,
+                deleted=[], cursor=new_cursor, resync_required=False
+            )
+
+        [since] = decode_cursor(cursor)
+        since = parse_datetime(since) if isinstance(since, str) else None
+        if since is None:
+            raise ValueError("Invalid cursor")
+
+        # Tombstones older than the retention window have been pruned
+        if since < now - timedelta(days=settings.CHANGES_TOMBSTONE_RETENTION_DAYS):
+            return ChangeSetType(
+                projects=[], tasks=[], comments=[], deleted=[],
+                cursor=None, resync_required=True
+            )
+
+        deleted = Tombstone.objects.filter(organization=org, deleted_at__gt=since)
+        return ChangeSetType(
+            projects=projects.filter(updated_at__gt=since),
+            tasks=tasks.filter(updated_at__gt=since),
+            comments=comments.filter(updated_at__gt=since),
+            deleted=[
+                DeletedObjectType(model=t.model, id=t.object_id, deleted_at=t.deleted_at)
+                for t in deleted
+            ],
+            cursor=new_cursor,
+            resync_required=False
+        )
+
+    def resolve_job_status(self, info, id, organization_slug=None):
+        job = Job.objects.select_related('organization').filter(id=id).first()
+        if job is None:
+            return None
+        # Organization jobs are only visible within their organization
+        if job.organization_id and (
+            organization_slug is None or job.organization.slug != organization_slug
+        ):
+            return None
+        return job
+
+    def resolve_tasks_by_assignee(self, info, organization_slug, email, status=None, first=50, after=None):
+        try:
+            org = Organization.objects.get(slug=organization_slug)
+        except Organization.DoesNotExist:
+            return TaskPageType(tasks=[], end_cursor=None, has_next_page=False)
+
+        # Served by core_task_assignee_idx
+        tasks = Task.objects.visible_in(org).filter(assignee_email=email)
+        if status is not None:
+            tasks = tasks.filter(status=status)
+        tasks = tasks.order_by('-created_at', '-id')
+        rows, end_cursor, has_next_page = paginate(
+            with_comment_previews(tasks, info), first, after, [('created_at', True), ('id', True)]
+        )
+        return TaskPageType(tasks=rows, end_cursor=end_cursor, has_next_page=has_next_page)
+
+    def resolve_overdue_tasks(self, info, organization_slug, before=None, first=50, after=None):
+        try:
+            org = Organization.objects.get(slug=organization_slug)
+        except Organization.DoesNotExist:
+            return TaskPageType(tasks=[], end_cursor=None, has_next_page=False)
+
+        # Served by the partial index core_task_overdue_idx
+        tasks = Task.objects.visible_in(org).filter(
+            ~Q(status='DONE'),
+            due_date__lt=before or timezone.now(),
+        ).order_by('due_date', 'id')
+        rows, end_cursor, has_next_page = paginate(
+            with_comment_previews(tasks, info), first, after, [('due_date', False), ('id', False)]
+        )
+        return TaskPageType(tasks=rows, end_cursor=end_cursor, has_next_page=has_next_page)
+
 
 # Mutations
 class CreateProject(graphene.Mutation):
@@ -236,7 +549,7 @@ class UpdateTask(graphene.Mutation):
 
     def mutate(self, info, id, title=None, description=None, status=None, assignee_email=None, due_date=None):
         try:
-            task = Task.objects.get(id=id)
+            task = Task.objects.filter(project__deleted_at__isnull=True).get(id=id)
             
             if title is not None:
                 task.title = title
@@ -269,7 +582,7 @@ class AddComment(graphene.Mutation):
 
     def mutate(self, info, task_id, content, author_email):
         try:
-            task = Task.objects.get(id=task_id)
+            task = Task.objects.filter(project__deleted_at__isnull=True).get(id=task_id)
             comment = TaskComment.objects.create(
                 task=task,
                 content=content,
@@ -282,12 +595,117 @@ class AddComment(graphene.Mutation):
             return AddComment(comment=None, success=False, errors=[str(e)])
 
 
+class RestoreProject(graphene.Mutation):
+    class Arguments:
+        id = graphene.ID(required=True)
+        organization_slug = graphene.String(required=True)
+
+    project = graphene.Field(ProjectType)
+    success = graphene.Boolean()
+    errors = graphene.List(graphene.String)
+
+    def mutate(self, info, id, organization_slug):
+        try:
+            org = Organization.objects.get(slug=organization_slug)
+            ArchivedProject.objects.get(id=id, organization=org)
+            project = restore_project(id)
+            return RestoreProject(project=project, success=True, errors=[])
+        except Organization.DoesNotExist:
+            return RestoreProject(project=None, success=False, errors=["Organization not found"])
+        except ArchivedProject.DoesNotExist:
+            return RestoreProject(project=None, success=False, errors=["Archived project not found"])
+        except Exception as e:
+            return RestoreProject(project=None, success=False, errors=[str(e)])
+
+
+# Job kinds clients may queue. They take no payload and only read the
+# requesting organization; archive, purge and maintenance jobs are queued
+# by the server itself.
+CLIENT_JOB_KINDS = {'project_stats'}
+
+
+class EnqueueJob(graphene.Mutation):
+    class Arguments:
+        kind = graphene.String(required=True)
+        organization_slug = graphene.String(required=True)
+
+    job = graphene.Field(JobType)
+    success = graphene.Boolean()
+    errors = graphene.List(graphene.String)
+
+    def mutate(self, info, kind, organization_slug):
+        if kind not in CLIENT_JOB_KINDS:
+            return EnqueueJob(job=None, success=False, errors=[f"Unknown job kind: {kind}"])
+        try:
+            org = Organization.objects.get(slug=organization_slug)
+            job = enqueue(kind, organization=org)
+            return EnqueueJob(job=job, success=True, errors=[])
+        except Organization.DoesNotExist:
+            return EnqueueJob(job=None, success=False, errors=["Organization not found"])
+        except Exception as e:
+            return EnqueueJob(job=None, success=False, errors=[str(e)])
+
+
+class DeleteProject(graphene.Mutation):
+    class Arguments:
+        id = graphene.ID(required=True)
+        organization_slug = graphene.String(required=True)
+
+    job = graphene.Field(JobType)
+    success = graphene.Boolean()
+    errors = graphene.List(graphene.String)
+
+    def mutate(self, info, id, organization_slug):
+        try:
+            org = Organization.objects.get(slug=organization_slug)
+            project = Project.objects.get(id=id, organization=org)
+            # The project disappears now; its rows are purged by a background job
+            job = hide_project(project)
+            return DeleteProject(job=job, success=True, errors=[])
+        except Organization.DoesNotExist:
+            return DeleteProject(job=None, success=False, errors=["Organization not found"])
+        except Project.DoesNotExist:
+            return DeleteProject(job=None, success=False, errors=["Project not found"])
+        except Exception as e:
+            return DeleteProject(job=None, success=False, errors=[str(e)])
+
+
+class DeleteTask(graphene.Mutation):
+    class Arguments:
+        id = graphene.ID(required=True)
+        organization_slug = graphene.String(required=True)
+
+    success = graphene.Boolean()
+    errors = graphene.List(graphene.String)
+
+    def mutate(self, info, id, organization_slug):
+        try:
+            org = Organization.objects.get(slug=organization_slug)
+            task = Task.objects.visible_in(org).get(id=id)
+            purge_task(task)
+            return DeleteTask(success=True, errors=[])
+        except Organization.DoesNotExist:
+            return DeleteTask(success=False, errors=["Organization not found"])
+        except Task.DoesNotExist:
+            return DeleteTask(success=False, errors=["Task not found"])
+        except Exception as e:
+            return DeleteTask(success=False, errors=[str(e)])
+
+
 class Mutation(graphene.ObjectType):
     create_project = CreateProject.Field()
     update_project = UpdateProject.Field()
     create_task = CreateTask.Field()
     update_task = UpdateTask.Field()
     add_comment = AddComment.Field()
+    restore_project = RestoreProject.Field()
+    enqueue_job = EnqueueJob.Field()
+    delete_project = DeleteProject.Field()
+    delete_task = DeleteTask.Field()
 
 
-schema = graphene.Schema(query=Query, mutation=Mutation)
+schema = graphene.Schema(
+    query=Query,
+    mutation=Mutation,
+    directives=(*specified_directives, *INCREMENTAL_DIRECTIVES),
+)
@@ -0,0 +1,238 @@
+"""
+Preforking HTTP server behind `manage.py serve`.
+
+The parent process sets Django up, warms it (URLconf, GraphQL schema,
+frontend operations), opens the listening socket and then forks the
+workers, so they start warm and share the loaded code copy-on-write.
+Database connections are closed before forking; each worker opens its own.
+
+Each worker accepts connections on the inherited socket and serves them
+with wsgiref (WSGI) or uvicorn (ASGI, when installed). wsgiref handles one
+connection at a time and speaks HTTP/1.0 only, so there is no keep-alive;
+a client that doesn't send its request within ``request_timeout`` seconds
+is dropped so it can't hold the worker. A worker exits after
+``max_requests`` requests (plus some jitter, so workers don't all restart
+together) or once its resident memory passes ``max_rss_mb``, and the parent
+forks a replacement. On SIGTERM or SIGINT the parent stops the workers,
+which finish the request in hand, and kills any still running after
+``shutdown_timeout`` seconds.
+"""
+
+import gc
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import signal
+import socket
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from django.db import connections
+
+try:
+    import uvicorn
+except ImportError:  # pragma: no cover
+    uvicorn = None
+
+logger = logging.getLogger(__name__)
+
+
+def bind_socket(address, backlog=2048):
+    """Open the listening socket shared by all workers.
+
+    address is ``host:port``.
+    """
+    host, _, port = address.rpartition(':')
+    host = host.strip('[]') or '0.0.0.0'
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, int(port)))
+    sock.listen(backlog)
+    # Workers race to accept; the losers get EAGAIN instead of blocking
+    sock.setblocking(False)
+    return sock
+
+
+def rss_mb():
+    """Resident set size of the current process in MiB"""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        # Peak rather than current RSS; KiB on Linux, bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if peak > 2**32 else peak / 2**10
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def handle(self):
+        try:
+            super().handle()
+        except TimeoutError:
+            logger.debug("%s - timed out", self.address_string())
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+
+class PreforkWSGIServer(WSGIServer):
+    """wsgiref server on an already bound, shared listening socket"""
+
+    # Seconds handle_request() waits for a connection before returning,
+    # so the worker loop can notice a stop request
+    timeout = 1.0
+
+    def __init__(self, sock, app, request_timeout=30):
+        super().__init__(sock.getsockname()[:2], QuietRequestHandler, bind_and_activate=False)
+        self.socket.close()
+        self.socket = sock
+        host, port = sock.getsockname()[:2]
+        self.server_name = socket.getfqdn(host)
+        self.server_port = port
+        self.setup_environ()
+        self.set_app(app)
+        self.request_timeout = request_timeout
+        self.requests = 0
+
+    def get_request(self):
+        conn, address = self.socket.accept()
+        # Blocking, but a slow or idle client only holds the worker this long
+        conn.settimeout(self.request_timeout or None)
+        return conn, address
+
+    def process_request(self, request, client_address):
+        self.requests += 1
+        super().process_request(request, client_address)
+
+
+def serve_wsgi(sock, app, max_requests, max_rss_mb, stop, request_timeout=30):
+    """Serve WSGI requests until stop() is true or the worker should recycle.
+
+    Returns the reason the loop ended: 'stopped', 'max_requests' or 'max_rss'.
+    """
+    server = PreforkWSGIServer(sock, app, request_timeout)
+    while not stop():
+        if max_requests and server.requests >= max_requests:
+            return 'max_requests'
+        if max_rss_mb and rss_mb() > max_rss_mb:
+            return 'max_rss'
+        server.handle_request()
+    return 'stopped'
+
+
+def serve_asgi(sock, app, max_requests, max_rss_mb, shutdown_timeout):
+    """Serve ASGI requests with uvicorn until signalled or recycled"""
+    server = uvicorn.Server(uvicorn.Config(
+        app,
+        lifespan='off',
+        log_config=None,
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=shutdown_timeout,
+    ))
+
+    def watch_memory():
+        while not server.should_exit:
+            if max_rss_mb and rss_mb() > max_rss_mb:
+                logger.info("Worker %s over %s MiB, recycling", os.getpid(), max_rss_mb)
+                server.should_exit = True
+            time.sleep(1)
+
+    threading.Thread(target=watch_memory, daemon=True).start()
+    # uvicorn installs its own SIGTERM/SIGINT handlers for a graceful exit
+    server.run(sockets=[sock])
+
+
+def worker_process(sock, app, interface, max_requests, max_rss_mb, shutdown_timeout, request_timeout):
+    """Entry point for a forked server worker"""
+    if max_requests:
+        max_requests += random.randint(0, max_requests // 10)
+
+    if interface == 'asgi':
+        serve_asgi(sock, app, max_requests, max_rss_mb, shutdown_timeout)
+        return
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    reason = serve_wsgi(
+        sock, app, max_requests, max_rss_mb, stop=lambda: bool(stopping), request_timeout=request_timeout
+    )
+    if reason != 'stopped':
+        logger.info("Worker %s recycling (%s)", os.getpid(), reason)
+    connections.close_all()
+
+
+class Arbiter:
+    """Fork and supervise server workers"""
+
+    def __init__(self, sock, app, interface='wsgi', workers=1, max_requests=0,
+                 max_rss_mb=0, shutdown_timeout=30, request_timeout=30, log=logger.info):
+        if interface == 'asgi' and uvicorn is None:
+            raise RuntimeError("ASGI workers require uvicorn (pip install uvicorn)")
+        self.sock = sock
+        self.app = app
+        self.interface = interface
+        self.workers = workers
+        self.worker_args = (
+            sock, app, interface, max_requests, max_rss_mb, shutdown_timeout, request_timeout
+        )
+        self.shutdown_timeout = shutdown_timeout
+        self.log = log
+        self.context = multiprocessing.get_context('fork')
+        self.pool = {}
+        self.stopping = []
+
+    def spawn(self, index):
+        # Never share the parent's database connections with a child
+        connections.close_all()
+        process = self.context.Process(
+            target=worker_process,
+            args=self.worker_args,
+            name=f"serve-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self.pool[index] = process
+        return process
+
+    def run(self):
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.stopping.append(signum))
+        signal.signal(signal.SIGINT, lambda signum, frame: self.stopping.append(signum))
+
+        # Keep the warmed-up objects out of the collector so workers don't
+        # touch (and copy) those pages when they run a collection
+        gc.freeze()
+        for index in range(self.workers):
+            self.spawn(index)
+        self.log(f"Started {self.workers} {self.interface.upper()} worker(s)")
+
+        while not self.stopping:
+            for index, process in list(self.pool.items()):
+                if process.is_alive():
+                    continue
+                if process.exitcode != 0:
+                    self.log(f"Worker {index} exited with {process.exitcode}, restarting")
+                    # Don't spin if workers die on startup
+                    time.sleep(1)
+                self.spawn(index)
+            time.sleep(0.5)
+
+        self.stop()
+
+    def stop(self):
+        self.log("Shutting down workers...")
+        for process in self.pool.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in self.pool.values():
+            process.join(max(0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self.sock.close()
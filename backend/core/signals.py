@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Organization, Project, Task, TaskComment, Tombstone
+
+
+@receiver([post_save, post_delete], sender=Project)
+def project_changed(sender, instance, **kwargs):
+    Organization.bump_data_version(pk=instance.organization_id)
+
+
+@receiver([post_save, post_delete], sender=Task)
+def task_changed(sender, instance, **kwargs):
+    Organization.bump_data_version(pk=instance.organization_id)
+
+
+@receiver([post_save, post_delete], sender=TaskComment)
+def comment_changed(sender, instance, **kwargs):
+    Organization.bump_data_version(pk=instance.organization_id)
+
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=TaskComment)
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(
+        organization_id=instance.organization_id,
+        model=sender.__name__,
+        object_id=instance.pk,
+    )
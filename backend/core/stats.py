@@ -0,0 +1,21 @@
+from django.db.models import Count, Q
+
+from .models import Project, Task
+
+
+def compute_project_stats(org):
+    """Aggregate project and task counts for an organization"""
+    projects = Project.objects.filter(organization=org).aggregate(
+        total_projects=Count('id'),
+        active_projects=Count('id', filter=Q(status='ACTIVE')),
+        completed_projects=Count('id', filter=Q(status='COMPLETED')),
+    )
+    tasks = Task.objects.visible_in(org).aggregate(
+        total_tasks=Count('id'),
+        completed_tasks=Count('id', filter=Q(status='DONE')),
+    )
+
+    total_tasks = tasks['total_tasks']
+    completion_rate = (tasks['completed_tasks'] / total_tasks * 100) if total_tasks > 0 else 0
+
+    return dict(**projects, **tasks, completion_rate=completion_rate)
@@ -1,6 +1,41 @@
-from django.test import TestCase
+import gzip
+import io
+import itertools
+import json
+import os
+import pstats
+import re
+import runpy
+import socket
+import tempfile
+import threading
+import urllib.request
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
-from .models import Organization, Project, Task, TaskComment
+from django.utils import timezone
+from graphql import parse, print_ast
+from . import archive
+from .analytics import COUNT_FIELDS, run_org_analytics
+from .archive import archive_completed_projects, restore_project
+from .jobs import claim_job, enqueue, run_job, run_worker
+from .purge import hide_project, purge_project
+from .ratelimit import get_store, reset_store
+from .operations import FRONTEND_OPERATIONS
+from .models import (
+    ArchivedProject, ArchivedTask, ArchivedTaskComment, Job, JobLeaseLost, Organization, OrganizationAnalytics,
+    Project, Task, TaskComment, Tombstone,
+)
+from .schema import encode_cursor, schema
+from .server import bind_socket, rss_mb, serve_wsgi
+from .stats import compute_project_stats
 
 class GraphQLTestCase(TestCase):
     def setUp(self):
@@ -56,4 +91,1122 @@ class GraphQLTestCase(TestCase):
         self.assertEqual(comment.task, self.task)
         self.assertEqual(comment.author_email, "commenter@test.com")
 
-# Additional tests would be added here for GraphQL queries and mutations
\ No newline at end of file
+
+
+class GraphQLConditionalGetTestCase(TestCase):
+    query = '''
+        query GetProjects($organizationSlug: String!) {
+            projects(organizationSlug: $organizationSlug) { id name }
+        }
+    '''
+
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name="Test Org",
+            slug="test-org",
+            contact_email="test@test.com"
+        )
+        self.project = Project.objects.create(organization=self.org, name="Test Project")
+
+    def get(self, **headers):
+        return self.client.get('/graphql/', {
+            'query': self.query,
+            'variables': json.dumps({'organizationSlug': 'test-org'}),
+        }, HTTP_ACCEPT='application/json', **headers)
+
+    def test_get_query_has_etag(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_matching_etag_returns_304(self):
+        etag = self.get()['ETag']
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_writes_change_etag(self):
+        etag = self.get()['ETag']
+        task = Task.objects.create(project=self.project, title="New Task")
+        self.assertNotEqual(self.get()['ETag'], etag)
+
+        etag = self.get()['ETag']
+        TaskComment.objects.create(task=task, content="Hi", author_email="a@test.com")
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_queries_reading_other_organizations_have_no_etag(self):
+        Organization.objects.create(name="Other", slug="other", contact_email="o@test.com")
+        for query in (
+            '''query ($organizationSlug: String!) {
+                projects(organizationSlug: $organizationSlug) { id }
+                projectStats(organizationSlug: "other") { totalProjects }
+            }''',
+            '''query ($organizationSlug: String!, $other: String!) {
+                projects(organizationSlug: $organizationSlug) { id }
+                projectStats(organizationSlug: $other) { totalProjects }
+            }''',
+            '''query ($organizationSlug: String!) {
+                projects(organizationSlug: $organizationSlug) { id }
+                jobStatus(id: "1", organizationSlug: $organizationSlug) { status }
+            }''',
+        ):
+            response = self.client.get('/graphql/', {
+                'query': query,
+                'variables': json.dumps({'organizationSlug': 'test-org', 'other': 'other'}),
+            }, HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(response.has_header('ETag'), query)
+
+    def test_overdue_tasks_relative_to_now_have_no_etag(self):
+        query = '''query ($organizationSlug: String!, $before: DateTime) {
+            overdueTasks(organizationSlug: $organizationSlug, before: $before) { tasks { title } }
+        }'''
+
+        def get(before):
+            return self.client.get('/graphql/', {
+                'query': query,
+                'variables': json.dumps({'organizationSlug': 'test-org', 'before': before}),
+            }, HTTP_ACCEPT='application/json')
+
+        self.assertFalse(get(None).has_header('ETag'))
+        self.assertTrue(get('2026-01-01T00:00:00+00:00').has_header('ETag'))
+
+    def test_post_is_not_cached(self):
+        response = self.client.post('/graphql/', json.dumps({
+            'query': self.query,
+            'variables': {'organizationSlug': 'test-org'},
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_large_response_is_compressed(self):
+        for i in range(50):
+            Project.objects.create(organization=self.org, name=f"Project {i}" * 5)
+        etag = self.get()['ETag']
+
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(gzip.decompress(response.content), self.get().content)
+
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_small_response_is_not_compressed(self):
+        response = self.get(HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+
+class WarmupTestCase(TestCase):
+    def test_frontend_operations_validate(self):
+        """Every operation the frontend sends must validate against the schema"""
+        from .schema import schema
+        from .warmup import validate_operations
+
+        self.assertEqual(validate_operations(schema), [])
+
+    def test_warm_up_reports_each_step(self):
+        from .warmup import warm_up
+
+        steps = [step for step, _ in warm_up()]
+        self.assertEqual(steps, ['urlconf', 'schema', 'operations', 'database'])
+
+
+class TaskListQueryTestCase(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name="Test Org",
+            slug="test-org",
+            contact_email="test@test.com"
+        )
+        other = Organization.objects.create(name="Other", slug="other", contact_email="o@test.com")
+        self.project = Project.objects.create(organization=self.org, name="Test Project")
+        other_project = Project.objects.create(organization=other, name="Other Project")
+        past = timezone.now() - timedelta(days=1)
+        for i in range(5):
+            Task.objects.create(
+                project=self.project,
+                title=f"Task {i}",
+                assignee_email="dev@test.com",
+                status='DONE' if i == 0 else 'TODO',
+                due_date=past - timedelta(hours=i)
+            )
+        Task.objects.create(project=other_project, title="Other", assignee_email="dev@test.com", due_date=past)
+
+    def execute(self, query, **variables):
+        result = schema.execute(query, variables=variables)
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_task_organization_is_denormalized(self):
+        self.assertFalse(Task.objects.exclude(organization=F('project__organization')).exists())
+
+    def test_tasks_by_assignee_paginates(self):
+        query = '''
+            query ($after: String) {
+                tasksByAssignee(organizationSlug: "test-org", email: "dev@test.com", first: 2, after: $after) {
+                    tasks { title }
+                    endCursor
+                    hasNextPage
+                }
+            }
+        '''
+        titles, after = [], None
+        while True:
+            page = self.execute(query, after=after)['tasksByAssignee']
+            titles += [task['title'] for task in page['tasks']]
+            if not page['hasNextPage']:
+                break
+            after = page['endCursor']
+        self.assertEqual(titles, [f"Task {i}" for i in reversed(range(5))])
+
+    def test_overdue_tasks_excludes_done(self):
+        data = self.execute('''
+            { overdueTasks(organizationSlug: "test-org") { tasks { title } hasNextPage } }
+        ''')
+        titles = [task['title'] for task in data['overdueTasks']['tasks']]
+        self.assertEqual(titles, ["Task 4", "Task 3", "Task 2", "Task 1"])
+
+    def test_query_plans_use_indexes(self):
+        by_assignee = Task.objects.filter(
+            organization=self.org, assignee_email="dev@test.com"
+        ).order_by('-created_at', '-id')
+        self.assertIn('core_task_assignee_idx', by_assignee.explain())
+
+        overdue = Task.objects.filter(
+            ~Q(status='DONE'), organization=self.org, due_date__lt=timezone.now()
+        ).order_by('due_date', 'id')
+        self.assertIn('core_task_overdue_idx', overdue.explain())
+
+
+class ArchiveTestCase(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name="Test Org",
+            slug="test-org",
+            contact_email="test@test.com"
+        )
+        self.active = Project.objects.create(organization=self.org, name="Active")
+        self.completed = Project.objects.create(
+            organization=self.org, name="Completed", status='COMPLETED'
+        )
+        for i in range(5):
+            task = Task.objects.create(project=self.completed, title=f"Task {i}", status='DONE')
+            TaskComment.objects.create(task=task, content=f"Comment {i}", author_email="a@test.com")
+        self.created_at = Project.objects.get(pk=self.completed.pk).created_at
+
+    def project_names(self, include_archived=False):
+        result = schema.execute(
+            '''query ($includeArchived: Boolean) {
+                projects(organizationSlug: "test-org", includeArchived: $includeArchived) {
+                    name archived taskCount
+                }
+            }''',
+            variables={'includeArchived': include_archived}
+        )
+        self.assertIsNone(result.errors)
+        return {p['name']: (p['archived'], p['taskCount']) for p in result.data['projects']}
+
+    def test_archive_and_restore_round_trip(self):
+        count = archive_completed_projects(timezone.now() + timedelta(days=1), chunk_size=2)
+        self.assertEqual(count, 1)
+        self.assertFalse(Project.objects.filter(pk=self.completed.pk).exists())
+        self.assertEqual(Task.objects.count(), 0)
+        self.assertEqual(TaskComment.objects.count(), 0)
+        self.assertEqual(ArchivedTask.objects.count(), 5)
+        self.assertEqual(ArchivedTaskComment.objects.count(), 5)
+
+        self.assertEqual(self.project_names(), {"Active": (False, 0)})
+        self.assertEqual(self.project_names(include_archived=True), {
+            "Active": (False, 0),
+            "Completed": (True, 5),
+        })
+
+        restore_project(self.completed.pk, chunk_size=2)
+        self.assertFalse(ArchivedProject.objects.exists())
+        project = Project.objects.get(pk=self.completed.pk)
+        self.assertEqual(project.created_at, self.created_at)
+        self.assertEqual(project.tasks.count(), 5)
+        self.assertEqual(TaskComment.objects.filter(task__project=project).count(), 5)
+        self.assertEqual(self.project_names(), {"Active": (False, 0), "Completed": (False, 5)})
+
+    def archive_with(self, concurrent_write, after_chunk):
+        """Archive self.completed in chunks of 2, running concurrent_write after a chunk"""
+        original = archive._archive_tasks
+        chunks = []
+
+        def archive_tasks(project, tasks):
+            original(project, tasks)
+            chunks.append(tasks)
+            if len(chunks) == after_chunk:
+                concurrent_write()
+
+        with mock.patch.object(archive, '_archive_tasks', archive_tasks):
+            return archive.archive_project(self.completed.pk, chunk_size=2)
+
+    def test_task_created_after_last_chunk_is_archived(self):
+        self.assertTrue(self.archive_with(
+            lambda: Task.objects.create(project=self.completed, title="Late", status='DONE'),
+            after_chunk=3,
+        ))
+        self.assertFalse(Project.all_objects.filter(pk=self.completed.pk).exists())
+        self.assertEqual(Task.objects.count(), 0)
+        self.assertTrue(ArchivedTask.objects.filter(title="Late").exists())
+
+    def test_project_edited_during_archive_stays_hot(self):
+        def reopen():
+            project = Project.objects.get(pk=self.completed.pk)
+            project.status, project.name = 'ACTIVE', "Reopened"
+            project.save()
+
+        self.assertFalse(self.archive_with(reopen, after_chunk=1))
+        project = Project.objects.get(pk=self.completed.pk)
+        self.assertEqual((project.status, project.name), ('ACTIVE', "Reopened"))
+        self.assertEqual(project.tasks.count(), 5)
+        self.assertEqual(TaskComment.objects.count(), 5)
+        self.assertFalse(ArchivedProject.objects.exists())
+        self.assertFalse(ArchivedTask.objects.exists())
+
+    def test_cutoff_is_respected(self):
+        count = archive_completed_projects(timezone.now() - timedelta(days=1))
+        self.assertEqual(count, 0)
+        self.assertTrue(Project.objects.filter(pk=self.completed.pk).exists())
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name="Test Org",
+            slug="test-org",
+            contact_email="test@test.com"
+        )
+        project = Project.objects.create(organization=self.org, name="Test Project")
+        Task.objects.create(project=project, title="Done", status='DONE')
+        Task.objects.create(project=project, title="Todo")
+
+    def test_job_runs_and_reports_status(self):
+        result = schema.execute('''
+            mutation { enqueueJob(kind: "project_stats", organizationSlug: "test-org") {
+                success job { id status }
+            } }
+        ''')
+        self.assertIsNone(result.errors)
+        job_id = result.data['enqueueJob']['job']['id']
+        self.assertEqual(result.data['enqueueJob']['job']['status'], 'QUEUED')
+
+        self.assertEqual(run_worker('test', max_jobs=10), 1)
+
+        query = 'query ($id: ID!, $slug: String) { jobStatus(id: $id, organizationSlug: $slug) { status progress result } }'
+        data = schema.execute(query, variables={'id': job_id, 'slug': 'test-org'}).data
+        self.assertEqual(data['jobStatus']['status'], 'SUCCEEDED')
+        self.assertEqual(data['jobStatus']['progress'], 100)
+        self.assertEqual(json.loads(data['jobStatus']['result'])['completion_rate'], 50.0)
+
+        data = schema.execute(query, variables={'id': job_id, 'slug': 'other'}).data
+        self.assertIsNone(data['jobStatus'])
+
+    def test_clients_can_only_queue_safe_kinds(self):
+        result = schema.execute('''
+            mutation { enqueueJob(kind: "prune_tombstones", organizationSlug: "test-org") { success errors } }
+        ''')
+        self.assertIsNone(result.errors)
+        self.assertEqual(result.data['enqueueJob'], {
+            'success': False, 'errors': ["Unknown job kind: prune_tombstones"],
+        })
+        self.assertFalse(Job.objects.exists())
+
+    def test_claim_is_exclusive(self):
+        enqueue('project_stats', organization=self.org)
+        self.assertIsNotNone(claim_job('a'))
+        self.assertIsNone(claim_job('b'))
+
+    def test_failed_job_is_retried_then_fails(self):
+        job = enqueue('archive_projects', organization=self.org, payload={}, max_attempts=2)
+
+        run_job(claim_job('test'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('QUEUED', 1))
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertIn('KeyError', job.error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        run_job(claim_job('test'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 2))
+
+    def expire_lease(self, job):
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+    def test_progress_renews_the_lease(self):
+        enqueue('project_stats', organization=self.org)
+        job = claim_job('a')
+        self.expire_lease(job)
+        job.report_progress(1, 2)
+        self.assertIsNone(claim_job('b'))
+
+        self.expire_lease(job)
+        self.assertEqual(claim_job('b').pk, job.pk)
+        with self.assertRaises(JobLeaseLost):
+            job.report_progress(2, 2)
+        # The first worker's outcome doesn't overwrite the second's claim
+        self.assertFalse(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), ('RUNNING', 'b'))
+
+    def test_job_that_kills_its_worker_runs_out_of_attempts(self):
+        job = enqueue('project_stats', organization=self.org, max_attempts=2)
+        for attempt in (1, 2):
+            self.assertEqual(claim_job('test').attempts, attempt)
+            self.expire_lease(job)
+
+        self.assertFalse(run_job(claim_job('test')))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('FAILED', 3))
+        self.assertIsNone(claim_job('test'))
+
+
+@override_settings(GRAPHQL_RATE_LIMIT={
+    'ORG_RATE': 0.01,
+    'ORG_BURST': 10,
+    'CLIENT_RATE': 0.01,
+    'CLIENT_BURST': 100,
+    'MUTATION_COST': 5,
+    'MAX_CONCURRENT_PER_ORG': 1,
+})
+class RateLimitTestCase(TestCase):
+    def setUp(self):
+        reset_store()
+        self.addCleanup(reset_store)
+        self.org = Organization.objects.create(name="Test Org", slug="test-org", contact_email="test@test.com")
+
+    def post(self, query, **variables):
+        return self.client.post('/graphql/', json.dumps({
+            'query': query, 'variables': variables,
+        }), content_type='application/json')
+
+    def test_org_bucket_throttles_with_retry_after(self):
+        query = 'query ($organizationSlug: String!) { projectStats(organizationSlug: $organizationSlug) { totalProjects } }'
+        for _ in range(10):
+            self.assertEqual(self.post(query, organizationSlug='test-org').status_code, 200)
+
+        response = self.post(query, organizationSlug='test-org')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # Other organizations are unaffected
+        self.assertEqual(self.post(query, organizationSlug='other').status_code, 200)
+
+        metrics = self.client.get('/metrics/throttle/').content.decode()
+        self.assertIn('graphql_throttled_requests_total{reason="org"} 1', metrics)
+
+    def test_mutations_cost_more_and_inline_slug_is_used(self):
+        mutation = 'mutation { createProject(organizationSlug: "test-org", name: "P") { success } }'
+        self.assertEqual(self.post(mutation).status_code, 200)
+        self.assertEqual(self.post(mutation).status_code, 200)
+        self.assertEqual(self.post(mutation).status_code, 429)
+
+    def test_concurrency_cap(self):
+        store = get_store()
+        self.assertTrue(store.acquire(f'org:{self.org.pk}', 1))
+        response = self.post('{ projectStats(organizationSlug: "test-org") { totalProjects } }')
+        self.assertEqual(response.status_code, 429)
+        store.release(f'org:{self.org.pk}')
+        response = self.post('{ projectStats(organizationSlug: "test-org") { totalProjects } }')
+        self.assertEqual(response.status_code, 200)
+
+    def test_task_mutations_are_charged_to_the_owning_org(self):
+        project = Project.objects.create(organization=self.org, name="P")
+        create = 'mutation ($projectId: ID!) { createTask(projectId: $projectId, title: "T") { success } }'
+        self.assertEqual(self.post(create, projectId=project.pk).status_code, 200)
+        self.assertEqual(self.post(create, projectId=str(project.pk)).status_code, 200)
+        self.assertEqual(self.post(create, projectId=project.pk).status_code, 429)
+
+        reset_store()
+        task = Task.objects.first()
+        update = 'mutation { updateTask(id: "%d", status: "DONE") { success } }' % task.pk
+        comment = ('mutation ($taskId: ID!) '
+                   '{ addComment(taskId: $taskId, content: "c", authorEmail: "a@test.com") { success } }')
+        self.assertEqual(self.post(update).status_code, 200)
+        self.assertEqual(self.post(comment, taskId=task.pk).status_code, 200)
+        self.assertEqual(self.post(comment, taskId=task.pk).status_code, 429)
+
+    def test_unknown_organizations_get_no_buckets(self):
+        query = 'query ($organizationSlug: String!) { projectStats(organizationSlug: $organizationSlug) { totalProjects } }'
+        for i in range(20):
+            self.post(query, organizationSlug=f'made-up-{i}')
+        self.assertEqual(list(get_store().buckets), ['client:127.0.0.1'])
+
+    @override_settings(GRAPHQL_RATE_LIMIT={'MAX_ENTRIES': 3})
+    def test_local_store_is_bounded(self):
+        store = get_store()
+        for i in range(10):
+            store.take([(f'client:{i}', 1, 1.0, 10)])
+            store.set_owner(f'organizationSlug:{i}', 0, 60)
+        self.assertEqual(list(store.buckets), ['client:7', 'client:8', 'client:9'])
+        self.assertEqual(len(store.owners), 3)
+
+
+@override_settings(CHANGES_SAFETY_MARGIN=0)
+class ChangesSinceTestCase(TestCase):
+    query = '''
+        query ($cursor: String) {
+            changesSince(organizationSlug: "test-org", cursor: $cursor) {
+                projects { name }
+                tasks { title }
+                comments { content }
+                deleted { model id }
+                cursor
+                resyncRequired
+            }
+        }
+    '''
+
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name="Test Org",
+            slug="test-org",
+            contact_email="test@test.com"
+        )
+        self.project = Project.objects.create(organization=self.org, name="Test Project")
+        self.task = Task.objects.create(project=self.project, title="Task")
+        self.comment = TaskComment.objects.create(task=self.task, content="Hi", author_email="a@test.com")
+
+    def changes(self, cursor=None):
+        result = schema.execute(self.query, variables={'cursor': cursor})
+        self.assertIsNone(result.errors)
+        return result.data['changesSince']
+
+    def test_initial_sync_returns_everything(self):
+        changes = self.changes()
+        self.assertEqual(len(changes['projects']), 1)
+        self.assertEqual(len(changes['tasks']), 1)
+        self.assertEqual(len(changes['comments']), 1)
+        self.assertIsNotNone(changes['cursor'])
+
+    def test_delta_contains_only_changes_and_tombstones(self):
+        cursor = self.changes()['cursor']
+        Task.objects.filter(pk=self.task.pk).update(updated_at=timezone.now() - timedelta(days=1))
+
+        other = Task.objects.create(project=self.project, title="New Task")
+        comment_id = self.comment.pk
+        self.comment.delete()
+
+        changes = self.changes(cursor)
+        self.assertEqual([t['title'] for t in changes['tasks']], ["New Task"])
+        self.assertEqual(changes['comments'], [])
+        self.assertEqual(changes['deleted'], [{'model': 'TaskComment', 'id': str(comment_id)}])
+
+        self.assertEqual(self.changes(changes['cursor'])['tasks'], [])
+        self.assertEqual(other.organization_id, self.org.pk)
+
+    def test_archived_rows_are_reported_deleted(self):
+        cursor = self.changes()['cursor']
+        self.project.status = 'COMPLETED'
+        self.project.save()
+        archive_completed_projects(timezone.now() + timedelta(days=1))
+
+        deleted = {(d['model'], d['id']) for d in self.changes(cursor)['deleted']}
+        self.assertEqual(deleted, {
+            ('Project', str(self.project.pk)),
+            ('Task', str(self.task.pk)),
+            ('TaskComment', str(self.comment.pk)),
+        })
+
+    def test_restored_rows_come_back(self):
+        self.project.status = 'COMPLETED'
+        self.project.save()
+        archive_completed_projects(timezone.now() + timedelta(days=1))
+        cursor = self.changes()['cursor']
+
+        restore_project(self.project.pk)
+        changes = self.changes(cursor)
+        self.assertEqual([p['name'] for p in changes['projects']], ["Test Project"])
+        self.assertEqual([t['title'] for t in changes['tasks']], ["Task"])
+        self.assertEqual([c['content'] for c in changes['comments']], ["Hi"])
+        self.assertEqual(changes['deleted'], [])
+        self.assertFalse(Tombstone.objects.exists())
+
+    @override_settings(CHANGES_TOMBSTONE_RETENTION_DAYS=30)
+    def test_prune_tombstones_command(self):
+        self.comment.delete()
+        Tombstone.objects.create(organization=self.org, model='Task', object_id=999,
+                                 deleted_at=timezone.now() - timedelta(days=31))
+        call_command('prune_tombstones', stdout=io.StringIO())
+        self.assertEqual(list(Tombstone.objects.values_list('model', flat=True)), ['TaskComment'])
+
+    def test_stale_cursor_requires_resync(self):
+        stale = encode_cursor(timezone.now() - timedelta(days=365))
+        self.assertTrue(self.changes(stale)['resyncRequired'])
+
+
+class PurgeTestCase(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(
+            name="Test Org",
+            slug="test-org",
+            contact_email="test@test.com"
+        )
+        self.project = Project.objects.create(organization=self.org, name="Doomed")
+        self.keep = Project.objects.create(organization=self.org, name="Keep")
+        for i in range(7):
+            task = Task.objects.create(project=self.project, title=f"Task {i}", status='DONE')
+            for j in range(3):
+                TaskComment.objects.create(task=task, content=f"C{j}", author_email="a@test.com")
+        self.kept_task = Task.objects.create(project=self.keep, title="Kept")
+
+    def execute(self, query):
+        result = schema.execute(query)
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_delete_project_hides_then_purges_in_batches(self):
+        data = self.execute('''mutation { deleteProject(id: "%s", organizationSlug: "test-org") {
+            success job { id status }
+        } }''' % self.project.pk)
+        self.assertTrue(data['deleteProject']['success'])
+
+        # Hidden immediately, rows still present
+        names = [p['name'] for p in self.execute('{ projects(organizationSlug: "test-org") { name } }')['projects']]
+        self.assertEqual(names, ["Keep"])
+        stats = self.execute('{ projectStats(organizationSlug: "test-org") { totalProjects totalTasks } }')
+        self.assertEqual(stats['projectStats'], {'totalProjects': 1, 'totalTasks': 1})
+        self.assertEqual(Task.objects.filter(project_id=self.project.pk).count(), 7)
+
+        progress = []
+        self.assertEqual(purge_project(self.project.pk, self.org.pk, batch_size=3, progress=lambda d, t: progress.append(d)), 7)
+        self.assertEqual(progress, [3, 6, 7])
+        self.assertFalse(Project.all_objects.filter(pk=self.project.pk).exists())
+        self.assertEqual(TaskComment.objects.count(), 0)
+        self.assertEqual(Task.objects.get().title, "Kept")
+        self.assertEqual(Tombstone.objects.filter(model='TaskComment').count(), 21)
+        self.assertEqual(Tombstone.objects.filter(model='Task').count(), 7)
+        self.assertEqual(Tombstone.objects.filter(model='Project').count(), 1)
+
+    def test_tasks_of_hidden_project_cannot_be_changed(self):
+        task = Task.objects.filter(project=self.project).first()
+        hide_project(self.project)
+        data = self.execute('''mutation {
+            updateTask(id: "%s", status: "TODO") { success errors }
+            addComment(taskId: "%s", content: "Late", authorEmail: "a@test.com") { success errors }
+        }''' % (task.pk, task.pk))
+        self.assertEqual(data['updateTask'], {'success': False, 'errors': ["Task not found"]})
+        self.assertEqual(data['addComment'], {'success': False, 'errors': ["Task not found"]})
+        self.assertEqual(TaskComment.objects.filter(task=task).count(), 3)
+
+    def test_purge_job_reports_progress(self):
+        job = hide_project(self.project)
+        run_worker('test', max_jobs=1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress, job.result), ('SUCCEEDED', 100, {'deleted_tasks': 7}))
+
+    def test_purge_job_only_deletes_hidden_projects_of_its_org(self):
+        other_org = Organization.objects.create(name="Other", slug="other", contact_email="o@test.com")
+        other = Project.objects.create(organization=other_org, name="Theirs")
+        Task.objects.create(project=other, title="Theirs")
+        Project.all_objects.filter(pk=other.pk).update(deleted_at=timezone.now())
+
+        for project in (self.keep, other):
+            job = enqueue('purge_project', organization=self.org, payload={'project_id': project.pk})
+            run_worker('test', max_jobs=1)
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.result), ('SUCCEEDED', {'deleted_tasks': 0}))
+        self.assertTrue(Project.objects.filter(pk=self.keep.pk).exists())
+        self.assertTrue(Project.all_objects.filter(pk=other.pk).exists())
+        self.assertEqual(Task.objects.filter(project__in=[self.keep, other]).count(), 2)
+
+    def test_delete_task(self):
+        task = Task.objects.filter(project=self.project).first()
+        data = self.execute('''mutation { deleteTask(id: "%s", organizationSlug: "test-org") { success } }''' % task.pk)
+        self.assertTrue(data['deleteTask']['success'])
+        self.assertFalse(Task.objects.filter(pk=task.pk).exists())
+        self.assertFalse(TaskComment.objects.filter(task_id=task.pk).exists())
+
+
+class QueryRegressionTestCase(TestCase):
+    """Every frontend operation must run a constant number of indexed queries.
+
+    Each operation in core.operations (mirroring the frontend's queries.ts
+    and mutations.ts) runs against a small and a larger seeded dataset. The
+    SQL query count must not grow with the row count, and no statement may
+    full-scan core_task or core_taskcomment.
+    """
+
+    SMALL = (2, 2, 1)
+    LARGE = (6, 12, 3)
+    SCANNED_TABLES = ('core_task', 'core_taskcomment')
+
+    def seed(self, slug, projects, tasks, comments):
+        org = Organization.objects.create(name=slug, slug=slug, contact_email=f"{slug}@test.com")
+        for p in range(projects):
+            project = Project.objects.create(organization=org, name=f"Project {p}")
+            for t in range(tasks):
+                task = Task.objects.create(
+                    project=project,
+                    title=f"Task {t}",
+                    status=['TODO', 'IN_PROGRESS', 'DONE'][t % 3],
+                    assignee_email="dev@test.com"
+                )
+                for c in range(comments):
+                    TaskComment.objects.create(task=task, content=f"C{c}", author_email="a@test.com")
+        project = org.projects.first()
+        return {
+            'organizationSlug': slug,
+            'id': str(project.pk),
+            'projectId': str(project.pk),
+            'taskId': str(project.tasks.first().pk),
+            'name': "Renamed",
+            'title': "Renamed",
+            'status': 'DONE',
+            'content': "Hello",
+            'authorEmail': "a@test.com",
+        }
+
+    def variables_for(self, name, context):
+        variables = dict(context)
+        if name in ('CreateProject', 'UpdateProject'):
+            variables['status'] = 'COMPLETED'
+        if name == 'UpdateTask':
+            variables['id'] = context['taskId']
+        return variables
+
+    def run_operation(self, name, variables):
+        document = FRONTEND_OPERATIONS[name]
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured:
+                result = schema.execute(document, variables=variables)
+            transaction.set_rollback(True)
+        self.assertIsNone(result.errors, f"{name}: {result.errors}")
+        return [query['sql'] for query in captured.captured_queries]
+
+    def full_scans(self, sql):
+        """Return plan lines that scan one of SCANNED_TABLES end to end"""
+        if not sql.lstrip().upper().startswith('SELECT'):
+            return []
+        # Django may alias joined tables as T2, T3, ...
+        names = set(self.SCANNED_TABLES) | {
+            alias for table, alias in re.findall(r'"(\w+)" (T\d+)\b', sql)
+            if table in self.SCANNED_TABLES
+        }
+        if connection.vendor == 'postgresql':
+            return self.postgres_full_scans(sql, {name.lower() for name in names})
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            lines = [row[-1] for row in cursor.fetchall()]
+        # SEARCH uses an index lookup; SCAN (even of an index) visits every row
+        return [
+            line for line in lines
+            if line.startswith('SCAN ') and line.split()[1] in names
+        ]
+
+    def postgres_full_scans(self, sql, names):
+        # A savepoint rolled back undoes SET LOCAL for the rest of the test
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}')
+            lines = [row[0] for row in cursor.fetchall()]
+            transaction.set_rollback(True)
+
+        pattern = re.compile(r'(Seq Scan|Index (?:Only )?Scan)(?: Backward)?(?: using \w+)? on (\w+)(?: (\w+))?')
+        scans = []
+        for i, line in enumerate(lines):
+            match = pattern.search(line)
+            if not match or not names & set(match.groups()[1:]):
+                continue
+            if match.group(1) == 'Seq Scan':
+                scans.append(line)
+                continue
+            # An index scan without Index Cond walks the whole index
+            indent = len(line) - len(line.lstrip(' ->'))
+            details = itertools.takewhile(
+                lambda detail: len(detail) - len(detail.lstrip()) > indent
+                and not detail.lstrip().startswith('->'),
+                lines[i + 1:],
+            )
+            if not any(detail.lstrip().startswith('Index Cond:') for detail in details):
+                scans.append(line)
+        return scans
+
+    def test_frontend_operations(self):
+        small = self.seed('small', *self.SMALL)
+        large = self.seed('large', *self.LARGE)
+
+        for name in FRONTEND_OPERATIONS:
+            with self.subTest(operation=name):
+                small_queries = self.run_operation(name, self.variables_for(name, small))
+                large_queries = self.run_operation(name, self.variables_for(name, large))
+                self.assertEqual(
+                    len(small_queries), len(large_queries),
+                    f"{name} query count grows with data size:\n" + "\n".join(large_queries)
+                )
+                for sql in large_queries:
+                    self.assertEqual(self.full_scans(sql), [], f"{name} full scan in:\n{sql}")
+
+
+FRONTEND_GRAPHQL_DIR = settings.BASE_DIR.parent / 'frontend' / 'src' / 'graphql'
+
+
+@skipUnless(FRONTEND_GRAPHQL_DIR.is_dir(), "frontend/ is not checked out")
+class FrontendOperationsTestCase(SimpleTestCase):
+    """core.operations must match the documents in queries.ts and mutations.ts"""
+
+    def frontend_operations(self):
+        operations = {}
+        for filename in ('queries.ts', 'mutations.ts'):
+            source = (FRONTEND_GRAPHQL_DIR / filename).read_text()
+            for text in re.findall(r'\bgql`(.*?)`', source, re.DOTALL):
+                document = parse(text)
+                operations[document.definitions[0].name.value] = print_ast(document)
+        return operations
+
+    def test_operations_match_frontend(self):
+        frontend = self.frontend_operations()
+        self.assertEqual(sorted(frontend), sorted(FRONTEND_OPERATIONS))
+        for name, document in FRONTEND_OPERATIONS.items():
+            with self.subTest(operation=name):
+                self.assertEqual(print_ast(parse(document)), frontend[name])
+
+
+@override_settings(GRAPHQL_STREAM_BATCH_SIZE=2)
+class IncrementalDeliveryTestCase(TestCase):
+    def setUp(self):
+        reset_store()
+        self.addCleanup(reset_store)
+        self.org = Organization.objects.create(name="Test Org", slug="test-org", contact_email="test@test.com")
+        self.project = Project.objects.create(organization=self.org, name="Test Project")
+        for i in range(5):
+            Task.objects.create(project=self.project, title=f"Task {i}", status='DONE' if i < 2 else 'TODO')
+
+    def get(self, query, accept='multipart/mixed;deferSpec=20220824, application/json', **variables):
+        return self.client.get('/graphql/', {
+            'query': query, 'variables': json.dumps({'organizationSlug': 'test-org', **variables}),
+        }, HTTP_ACCEPT=accept)
+
+    def payloads(self, response):
+        self.assertTrue(response.streaming)
+        self.assertTrue(response['Content-Type'].startswith('multipart/mixed'))
+        body = b''.join(response.streaming_content).decode()
+        response.close()
+        self.assertTrue(body.endswith('\r\n-----\r\n'))
+        parts = body[:-len('\r\n-----\r\n')].split('\r\n---\r\n')[1:]
+        return [json.loads(part.split('\r\n\r\n', 1)[1]) for part in parts]
+
+    def test_stream_tasks_in_batches(self):
+        query = '''
+            query ($projectId: ID!, $organizationSlug: String!) {
+                tasks(projectId: $projectId, organizationSlug: $organizationSlug) @stream(initialCount: 1) { title }
+            }
+        '''
+        payloads = self.payloads(self.get(query, projectId=self.project.pk))
+        titles = [task.title for task in Task.objects.filter(project=self.project)]
+
+        self.assertEqual(payloads[0], {'data': {'tasks': [{'title': titles[0]}]}, 'hasNext': True})
+        self.assertEqual(
+            [entry['path'] for payload in payloads[1:] for entry in payload['incremental']],
+            [['tasks', 1], ['tasks', 3]],
+        )
+        streamed = [item['title'] for payload in payloads[1:] for item in payload['incremental'][0]['items']]
+        self.assertEqual(streamed, titles[1:])
+        self.assertEqual([payload['hasNext'] for payload in payloads], [True, True, False])
+
+    def test_defer_project_counts(self):
+        query = '''
+            query ($organizationSlug: String!) {
+                projects(organizationSlug: $organizationSlug) {
+                    name
+                    ... @defer(label: "counts") { taskCount completedTasks }
+                }
+                ... @defer { projectStats(organizationSlug: $organizationSlug) { totalTasks } }
+            }
+        '''
+        payloads = self.payloads(self.get(query))
+
+        self.assertEqual(payloads[0], {'data': {'projects': [{'name': 'Test Project'}]}, 'hasNext': True})
+        entries = [entry for payload in payloads[1:] for entry in payload['incremental']]
+        self.assertEqual(entries, [
+            {'data': {'taskCount': 5, 'completedTasks': 2}, 'path': ['projects', 0], 'label': 'counts'},
+            {'data': {'projectStats': {'totalTasks': 5}}, 'path': []},
+        ])
+        self.assertFalse(payloads[-1]['hasNext'])
+
+    def test_plain_json_clients_get_complete_result(self):
+        query = '''
+            query ($projectId: ID!, $organizationSlug: String!) {
+                tasks(projectId: $projectId, organizationSlug: $organizationSlug) @stream { title }
+            }
+        '''
+        response = self.get(query, accept='application/json', projectId=self.project.pk)
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(json.loads(response.content)['data']['tasks']), 5)
+
+    @override_settings(GRAPHQL_RATE_LIMIT={'MAX_CONCURRENT_PER_ORG': 1})
+    def test_stream_holds_concurrency_slot_until_closed(self):
+        query = 'query ($organizationSlug: String!) { ... @defer { projectStats(organizationSlug: $organizationSlug) { totalTasks } } }'
+        streaming = self.get(query)
+        self.assertTrue(streaming.streaming)
+        self.assertEqual(self.get(query).status_code, 429)
+        self.payloads(streaming)
+        self.assertEqual(self.get(query).status_code, 200)
+
+
+class ProfilingTestCase(TestCase):
+    query = 'query GetProjectStats($organizationSlug: String!) { projectStats(organizationSlug: $organizationSlug) { totalTasks } }'
+
+    def setUp(self):
+        reset_store()
+        self.addCleanup(reset_store)
+        Organization.objects.create(name="Test Org", slug="test-org", contact_email="test@test.com")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def profiling(self, **config):
+        return override_settings(GRAPHQL_PROFILING={
+            'TOKEN': 'secret', 'SAMPLE_RATE': 0, 'DIRECTORY': self.directory, **config,
+        })
+
+    def post(self, **headers):
+        return self.client.post('/graphql/', json.dumps({
+            'query': self.query, 'variables': {'organizationSlug': 'test-org'},
+        }), content_type='application/json', **headers)
+
+    def test_header_writes_profile_artifacts(self):
+        with self.profiling():
+            response = self.post(HTTP_X_GRAPHQL_PROFILE='secret')
+        self.assertEqual(response.status_code, 200)
+
+        base = os.path.join(self.directory, response['X-GraphQL-Profile-Id'])
+        self.assertTrue(response['X-GraphQL-Profile-Id'].startswith('GetProjectStats/'))
+        self.assertIn('resolve_project_stats', {func[2] for func in pstats.Stats(base + '.prof').stats})
+        with open(base + '.collapsed') as f:
+            for line in f:
+                self.assertRegex(line, r'^\S.* \d+$')
+        with open(base + '.json') as f:
+            report = json.load(f)
+        self.assertEqual(report['trigger'], 'header')
+        self.assertEqual(report['query_count'], len(report['queries']))
+        self.assertTrue(any('core_task' in query['sql'] for query in report['queries']))
+
+    def test_not_profiled_without_valid_token(self):
+        with self.profiling():
+            response = self.post(HTTP_X_GRAPHQL_PROFILE='wrong')
+        self.assertFalse(response.has_header('X-GraphQL-Profile-Id'))
+        with self.profiling(TOKEN=''):
+            self.post(HTTP_X_GRAPHQL_PROFILE='')
+        with self.profiling():
+            response = self.post(HTTP_X_GRAPHQL_PROFILE='sécret')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_operation_folders_are_capped(self):
+        os.mkdir(os.path.join(self.directory, 'Other'))
+        with self.profiling(MAX_OPERATIONS=1):
+            response = self.post(HTTP_X_GRAPHQL_PROFILE='secret')
+        self.assertTrue(response['X-GraphQL-Profile-Id'].startswith('anonymous/'))
+        self.assertEqual(sorted(os.listdir(self.directory)), ['Other', 'anonymous'])
+
+        os.mkdir(os.path.join(self.directory, 'GetProjectStats'))
+        with self.profiling(MAX_OPERATIONS=1):
+            response = self.post(HTTP_X_GRAPHQL_PROFILE='secret')
+        self.assertTrue(response['X-GraphQL-Profile-Id'].startswith('GetProjectStats/'))
+
+    def test_sampled_requests_are_profiled(self):
+        with self.profiling(SAMPLE_RATE=1.0):
+            response = self.post()
+        self.assertFalse(response.has_header('X-GraphQL-Profile-Id'))
+        files = os.listdir(os.path.join(self.directory, 'GetProjectStats'))
+        self.assertEqual(sorted(os.path.splitext(name)[1] for name in files), ['.collapsed', '.json', '.prof'])
+
+    def test_old_profiles_are_pruned(self):
+        directory = os.path.join(self.directory, 'GetProjectStats')
+        profile_ids = []
+        with self.profiling(KEEP=2):
+            for i in range(4):
+                profile_ids.append(self.post(HTTP_X_GRAPHQL_PROFILE='secret')['X-GraphQL-Profile-Id'])
+                # Give every profile its own mtime
+                for name in os.listdir(directory):
+                    path = os.path.join(directory, name)
+                    os.utime(path, (os.path.getmtime(path) - 10,) * 2)
+
+        kept = {os.path.splitext(name)[0] for name in os.listdir(directory)}
+        self.assertEqual(kept, {profile_id.split('/')[1] for profile_id in profile_ids[-2:]})
+        self.assertEqual(len(os.listdir(directory)), 6)
+
+
+class OrgAnalyticsTestCase(TestCase):
+    def setUp(self):
+        past = timezone.now() - timedelta(days=1)
+        self.orgs = []
+        for i in range(3):
+            org = Organization.objects.create(name=f"Org {i}", slug=f"org-{i}", contact_email="o@test.com")
+            self.orgs.append(org)
+            for j in range(i):
+                project = Project.objects.create(
+                    organization=org, name=f"P{j}", status='COMPLETED' if j else 'ACTIVE'
+                )
+                Task.objects.create(project=project, title="Done", status='DONE', due_date=past)
+                Task.objects.create(project=project, title="Late", status='TODO', due_date=past)
+                Task.objects.create(project=project, title="Doing", status='IN_PROGRESS')
+        hidden = Project.objects.create(organization=self.orgs[2], name="Hidden")
+        Task.objects.create(project=hidden, title="Hidden", due_date=past)
+        hide_project(hidden)
+
+    def test_report_matches_per_organization_stats(self):
+        result = run_org_analytics(workers=1, shard_size=2)
+        self.assertEqual(result, {'organizations': 3, 'shards': 2})
+
+        for org in self.orgs:
+            report = OrganizationAnalytics.objects.get(organization=org)
+            for field, value in compute_project_stats(org).items():
+                self.assertEqual(getattr(report, field), value, f"{org.slug} {field}")
+            self.assertEqual(report.overdue_tasks, len(org.projects.all()))
+            self.assertEqual(report.in_progress_tasks, len(org.projects.all()))
+
+        # Re-running updates rows in place
+        Task.objects.filter(title="Late").update(status='DONE')
+        run_org_analytics(workers=1, shard_size=10)
+        self.assertEqual(OrganizationAnalytics.objects.count(), 3)
+        self.assertEqual(OrganizationAnalytics.objects.get(organization=self.orgs[2]).overdue_tasks, 0)
+
+    def test_process_pool_matches_serial_run(self):
+        run_org_analytics(workers=1, shard_size=1)
+        serial = {
+            report.organization_id: [getattr(report, field) for field in (*COUNT_FIELDS, 'completion_rate')]
+            for report in OrganizationAnalytics.objects.all()
+        }
+        OrganizationAnalytics.objects.all().delete()
+
+        # Django keeps the in-memory test database open across close_all(),
+        # so the forked workers read this test's rows through their copy
+        shards_done = []
+        result = run_org_analytics(workers=3, shard_size=1, progress=lambda done, total: shards_done.append(done))
+        self.assertEqual(result, {'organizations': 3, 'shards': 3})
+        self.assertEqual(shards_done, [1, 2, 3])
+        pooled = {
+            report.organization_id: [getattr(report, field) for field in (*COUNT_FIELDS, 'completion_rate')]
+            for report in OrganizationAnalytics.objects.all()
+        }
+        self.assertEqual(pooled, serial)
+
+    def test_admin_report(self):
+        run_org_analytics(workers=1)
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@test.com', 'pw'))
+        response = self.client.get('/admin/core/organizationanalytics/')
+        self.assertContains(response, '9 tasks (3 done, 3 overdue)')
+
+
+class TaskCommentsTestCase(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Test Org", slug="test-org", contact_email="test@test.com")
+        self.project = Project.objects.create(organization=self.org, name="Test Project")
+        self.tasks = [Task.objects.create(project=self.project, title=f"Task {i}") for i in range(3)]
+        for task, count in zip(self.tasks, (0, 2, 5)):
+            for i in range(count):
+                TaskComment.objects.create(task=task, content=f"{task.title} #{i}", author_email="a@test.com")
+
+    def execute(self, query, **variables):
+        result = schema.execute(query, variables={'organizationSlug': 'test-org', **variables})
+        self.assertIsNone(result.errors)
+        return result.data
+
+    def test_counts_and_latest_comments_in_one_query(self):
+        query = '''
+            query ($projectId: ID!, $organizationSlug: String!, $n: Int) {
+                tasks(projectId: $projectId, organizationSlug: $organizationSlug) {
+                    title
+                    commentCount
+                    latestComments(n: $n) { content }
+                }
+            }
+        '''
+        with CaptureQueriesContext(connection) as queries:
+            tasks = self.execute(query, projectId=self.project.pk, n=2)['tasks']
+        comment_queries = [q['sql'] for q in queries if 'core_taskcomment' in q['sql']]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertIn('ROW_NUMBER', comment_queries[0])
+
+        by_title = {task['title']: task for task in tasks}
+        self.assertEqual(by_title['Task 0'], {'title': 'Task 0', 'commentCount': 0, 'latestComments': []})
+        self.assertEqual(by_title['Task 1']['commentCount'], 2)
+        self.assertEqual(by_title['Task 2']['commentCount'], 5)
+        self.assertEqual(
+            [comment['content'] for comment in by_title['Task 2']['latestComments']],
+            ['Task 2 #4', 'Task 2 #3'],
+        )
+
+    def test_comments_connection_paginates(self):
+        query = '''
+            query ($organizationSlug: String!, $after: String) {
+                tasksByAssignee(organizationSlug: $organizationSlug, email: "") {
+                    tasks { title comments(first: 2, after: $after) { comments { content } endCursor hasNextPage } }
+                }
+            }
+        '''
+        Task.objects.update(assignee_email="")
+        contents, after = [], None
+        while True:
+            tasks = self.execute(query, after=after)['tasksByAssignee']['tasks']
+            page = next(task for task in tasks if task['title'] == 'Task 2')['comments']
+            contents += [comment['content'] for comment in page['comments']]
+            if not page['hasNextPage']:
+                break
+            after = page['endCursor']
+        self.assertEqual(contents, [f"Task 2 #{i}" for i in range(5)])
+
+
+class ServeTestCase(TestCase):
+    @staticmethod
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return [b'ok']
+
+    def test_refuses_to_serve_with_debug(self):
+        with override_settings(DEBUG=True), self.assertRaisesRegex(CommandError, 'DEBUG is on'):
+            call_command('serve')
+
+    def test_worker_recycles_after_max_requests(self):
+        sock = bind_socket('127.0.0.1:0')
+        self.addCleanup(sock.close)
+        result = []
+        worker = threading.Thread(target=lambda: result.append(
+            serve_wsgi(sock, self.app, max_requests=2, max_rss_mb=0, stop=lambda: False)
+        ))
+        worker.start()
+        url = 'http://127.0.0.1:%d/' % sock.getsockname()[1]
+        for _ in range(2):
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertEqual(response.read(), b'ok')
+        worker.join(5)
+        self.assertEqual(result, ['max_requests'])
+
+    def test_idle_client_does_not_hold_the_worker(self):
+        sock = bind_socket('127.0.0.1:0')
+        self.addCleanup(sock.close)
+        idle = socket.create_connection(sock.getsockname()[:2])
+        self.addCleanup(idle.close)
+        worker = threading.Thread(target=serve_wsgi, args=(sock, self.app, 2, 0, lambda: False, 0.2))
+        worker.start()
+        url = 'http://127.0.0.1:%d/' % sock.getsockname()[1]
+        with urllib.request.urlopen(url, timeout=5) as response:
+            self.assertEqual(response.read(), b'ok')
+        worker.join(5)
+        self.assertFalse(worker.is_alive())
+
+    def test_worker_recycles_over_memory_cap(self):
+        self.assertGreater(rss_mb(), 1)
+        sock = bind_socket('127.0.0.1:0')
+        self.addCleanup(sock.close)
+        self.assertEqual(serve_wsgi(sock, self.app, max_requests=0, max_rss_mb=1, stop=lambda: False), 'max_rss')
+
+    def test_gunicorn_worker_recycles_over_memory_cap(self):
+        config = runpy.run_path(str(settings.BASE_DIR / 'gunicorn.conf.py'))
+        self.assertTrue(config['preload_app'])
+        worker = mock.Mock(alive=True)
+        with override_settings(SERVE_MAX_RSS_MB=100000):
+            config['post_request'](worker, None, {}, None)
+        self.assertTrue(worker.alive)
+        with override_settings(SERVE_MAX_RSS_MB=1):
+            config['post_request'](worker, None, {}, None)
+        self.assertFalse(worker.alive)
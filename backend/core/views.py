@@ -1,3 +1,339 @@
-from django.shortcuts import render
+import hashlib
+import json
 
-# Create your views here.
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from django.utils.text import compress_string
+from graphene_django.views import (
+    GraphQLView as BaseGraphQLView,
+    HttpError,
+    get_accepted_content_types,
+)
+from graphql import (
+    BREAK,
+    FieldNode,
+    OperationType,
+    VariableNode,
+    Visitor,
+    get_operation_ast,
+    parse,
+    validate,
+    visit,
+)
+
+from .incremental import IncrementalExecutionContext, uses_incremental_delivery
+from .models import Organization
+from .profiling import profile_response, should_profile
+from .ratelimit import get_store
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+
+def dumps(data):
+    """Serialize data to compact JSON bytes, preferring orjson when installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data)
+        except TypeError:
+            # e.g. integers wider than 64 bits; let the stdlib handle them
+            pass
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+
+def get_accepted_encodings(request):
+    """Return the content codings the client accepts with a non-zero q-value"""
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(coding)
+    return accepted
+
+
+# Root fields whose results aren't covered by Organization.data_version
+UNVERSIONED_FIELDS = {'jobStatus'}
+# Root fields that read the clock unless the named argument pins the time
+CLOCK_FIELDS = {'overdueTasks': 'before'}
+
+
+class _UnboundSlugFinder(Visitor):
+    found = False
+
+    def enter_argument(self, node, *args):
+        if node.name.value == 'organizationSlug' and not (
+            isinstance(node.value, VariableNode) and node.value.name.value == 'organizationSlug'
+        ):
+            self.found = True
+            return BREAK
+
+
+def reads_only_variable_organization(document, operation, variables):
+    """Return True if the operation only reads the ``$organizationSlug`` organization.
+
+    Every root field must take ``organizationSlug: $organizationSlug`` and
+    no other organizationSlug argument may appear anywhere in the document,
+    so the organization's data_version covers the whole result. Fields in
+    UNVERSIONED_FIELDS, and CLOCK_FIELDS without their time argument, are
+    not covered by it.
+    """
+    for selection in operation.selection_set.selections:
+        if not isinstance(selection, FieldNode):
+            return False
+        name = selection.name.value
+        if name == '__typename':
+            continue
+        arguments = {
+            argument.name.value
+            for argument in selection.arguments
+            # A variable left null falls back to the default like a missing argument
+            if not isinstance(argument.value, VariableNode)
+            or variables.get(argument.value.name.value) is not None
+        }
+        if name in UNVERSIONED_FIELDS or 'organizationSlug' not in arguments:
+            return False
+        if name in CLOCK_FIELDS and CLOCK_FIELDS[name] not in arguments:
+            return False
+    finder = _UnboundSlugFinder()
+    visit(document, finder)
+    return not finder.found
+
+
+def encode_multipart(payloads):
+    """Frame JSON payloads as multipart/mixed parts with boundary "-" """
+    for payload in payloads:
+        yield b'\r\n---\r\nContent-Type: application/json; charset=utf-8\r\n\r\n' + dumps(payload)
+    yield b'\r\n-----\r\n'
+
+
+class GraphQLView(BaseGraphQLView):
+    """GraphQL endpoint tuned for large responses.
+
+    Query operations sent over GET whose root fields all read the
+    organization named by the ``$organizationSlug`` variable get a strong
+    ETag built from that organization's ``data_version`` and a hash of the
+    request. A matching
+    ``If-None-Match`` is answered with 304 before any resolver runs.
+
+    Results are encoded with orjson when available and compressed with
+    brotli or gzip once they exceed ``GRAPHQL_COMPRESSION_MIN_SIZE``.
+
+    Queries using @defer or @stream from clients that accept
+    ``multipart/mixed`` are streamed as incremental payloads instead.
+
+    Requests picked by core.profiling are run under the profiler.
+    """
+
+    # Brotli's default quality (11) is far too slow for dynamic responses.
+    brotli_quality = 5
+
+    def dispatch(self, request, *args, **kwargs):
+        trigger = should_profile(request)
+        if trigger is not None:
+            return profile_response(
+                lambda: self.respond(request, *args, **kwargs),
+                self.get_operation_name(request),
+                trigger,
+            )
+        return self.respond(request, *args, **kwargs)
+
+    def respond(self, request, *args, **kwargs):
+        if 'multipart/mixed' in get_accepted_content_types(request):
+            response = self.incremental_response(request)
+            if response is not None:
+                return response
+
+        etag = self.get_etag(request)
+        if etag is not None:
+            matched = self.match_etag(request, etag)
+            if matched is not None:
+                return self.add_cache_headers(HttpResponseNotModified(), matched)
+
+        response = super().dispatch(request, *args, **kwargs)
+        response = self.compress_response(request, response)
+
+        if etag is not None and response.status_code == 200:
+            if response.has_header('Content-Encoding'):
+                # Each representation needs its own strong validator.
+                etag = '%s-%s"' % (etag[:-1], response['Content-Encoding'])
+            self.add_cache_headers(response, etag)
+        return response
+
+    def get_operation_name(self, request):
+        """Return the requested operation's name, if any, without executing it"""
+        try:
+            query, _, operation_name, _ = self.get_graphql_params(request, self.parse_body(request))
+            if operation_name or not query:
+                return operation_name
+            operation_ast = get_operation_ast(parse(query))
+        except Exception:
+            return None
+        if operation_ast is None or operation_ast.name is None:
+            return None
+        return operation_ast.name.value
+
+    def incremental_response(self, request):
+        """Stream a query that uses @defer/@stream as multipart/mixed.
+
+        Returns None for anything else, including invalid requests, so the
+        regular code path handles them and reports errors as usual.
+        """
+        if self.batch or request.method not in ('GET', 'POST'):
+            return None
+        try:
+            data = self.parse_body(request)
+            query, variables, operation_name, _ = self.get_graphql_params(request, data)
+            document = parse(query)
+        except Exception:
+            return None
+
+        operation_ast = get_operation_ast(document, operation_name)
+        if (
+            operation_ast is None
+            or operation_ast.operation != OperationType.QUERY
+            or not uses_incremental_delivery(document)
+            or validate(self.schema.graphql_schema, document)
+        ):
+            return None
+
+        context = IncrementalExecutionContext.build(
+            self.schema.graphql_schema,
+            document,
+            root_value=self.get_root_value(request),
+            context_value=self.get_context(request),
+            raw_variable_values=variables,
+            operation_name=operation_name,
+            middleware=self.get_middleware(request),
+        )
+        if isinstance(context, list):
+            return None
+
+        response = StreamingHttpResponse(
+            encode_multipart(context.execute_incrementally()),
+            content_type='multipart/mixed; boundary="-"; deferSpec=20220824',
+        )
+        response['Cache-Control'] = 'no-cache'
+        # Keep reverse proxies such as nginx from buffering the parts
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def json_encode(self, request, d, pretty=False):
+        if self.batch or self.pretty or pretty or request.GET.get('pretty'):
+            return super().json_encode(request, d, pretty=pretty)
+        return dumps(d)
+
+    def compress_response(self, request, response):
+        if (
+            response.streaming
+            or response.status_code != 200
+            or response.has_header('Content-Encoding')
+            or len(response.content) < settings.GRAPHQL_COMPRESSION_MIN_SIZE
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = get_accepted_encodings(request)
+        if brotli is not None and 'br' in accepted:
+            response.content = brotli.compress(
+                response.content, quality=self.brotli_quality
+            )
+            response['Content-Encoding'] = 'br'
+        elif 'gzip' in accepted:
+            response.content = compress_string(response.content)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            return response
+
+        response['Content-Length'] = str(len(response.content))
+        return response
+
+    @staticmethod
+    def match_etag(request, etag):
+        """Return the If-None-Match validator matching etag, ignoring coding suffixes"""
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if not if_none_match:
+            return None
+        if if_none_match.strip() == '*':
+            return etag
+        for candidate in parse_etags(if_none_match):
+            if candidate == etag or candidate.startswith(etag[:-1] + '-'):
+                return candidate
+        return None
+
+    def get_etag(self, request):
+        if request.method != 'GET' or self.can_display_graphiql(request, {}):
+            return None
+
+        try:
+            query, variables, operation_name, _ = self.get_graphql_params(request, {})
+        except HttpError:
+            return None
+        if not query or not isinstance(variables, dict):
+            return None
+
+        organization_slug = variables.get('organizationSlug')
+        if not isinstance(organization_slug, str):
+            return None
+
+        try:
+            document = parse(query)
+            operation_ast = get_operation_ast(document, operation_name)
+        except Exception:
+            return None
+        if operation_ast is None or operation_ast.operation != OperationType.QUERY:
+            return None
+        if not reads_only_variable_organization(document, operation_ast, variables):
+            return None
+
+        version = (
+            Organization.objects.filter(slug=organization_slug)
+            .values_list('data_version', flat=True)
+            .first()
+        )
+        if version is None:
+            return None
+
+        key = json.dumps(
+            [organization_slug, version, operation_name, query, variables],
+            sort_keys=True,
+            separators=(',', ':'),
+        )
+        return '"%s"' % hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    def add_cache_headers(self, response, etag):
+        response['ETag'] = etag
+        patch_cache_control(response, **settings.GRAPHQL_CACHE_CONTROL)
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+
+def throttle_metrics(request):
+    """Expose rate limiter rejections in Prometheus text format"""
+    counters = get_store().get_counters()
+    lines = [
+        '# HELP graphql_throttled_requests_total Requests rejected by RateLimitMiddleware.',
+        '# TYPE graphql_throttled_requests_total counter',
+    ]
+    for reason in ('org', 'client', 'concurrency'):
+        lines.append(f'graphql_throttled_requests_total{{reason="{reason}"}} {counters.get(reason, 0)}')
+    return HttpResponse('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4')
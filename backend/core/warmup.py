@@ -0,0 +1,118 @@
+"""
+Worker warm-up and startup profiling.
+
+Everything a fresh worker would otherwise pay for on its first requests:
+importing the URLconf and GraphQL view, building the schema, parsing and
+validating the frontend's operations and opening database connections.
+"""
+
+import logging
+import re
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver
+from graphql import parse, validate
+
+logger = logging.getLogger(__name__)
+
+# Modules whose import cost dominates worker cold start.
+STARTUP_MODULES = ('config.urls', 'core.schema', 'core.views')
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+class WarmupError(Exception):
+    """Raised when a known operation no longer validates against the schema"""
+
+
+def warm_up():
+    """Prepare the current process to serve traffic.
+
+    Returns a list of ``(step, seconds)`` tuples. Raises WarmupError if any
+    frontend operation fails validation.
+    """
+    timings = []
+
+    def timed(step, func):
+        start = time.perf_counter()
+        result = func()
+        timings.append((step, time.perf_counter() - start))
+        return result
+
+    timed('urlconf', lambda: get_resolver().url_patterns)
+    schema = timed('schema', _load_schema)
+    errors = timed('operations', lambda: validate_operations(schema))
+    timed('database', _open_connections)
+
+    if errors:
+        raise WarmupError('; '.join(
+            f"{name}: {message}" for name, message in errors
+        ))
+    return timings
+
+
+def warm_up_on_startup():
+    """Run warm_up() if WARMUP_ON_STARTUP is enabled, logging instead of raising"""
+    if not getattr(settings, 'WARMUP_ON_STARTUP', False):
+        return
+    try:
+        timings = warm_up()
+    except Exception:
+        logger.exception("Worker warm-up failed")
+        return
+    logger.info("Worker warm-up finished in %.1f ms", sum(s for _, s in timings) * 1000)
+
+
+def validate_operations(schema):
+    """Parse and validate every frontend operation, returning any errors"""
+    from .operations import FRONTEND_OPERATIONS
+
+    errors = []
+    for name, document in FRONTEND_OPERATIONS.items():
+        for error in validate(schema.graphql_schema, parse(document)):
+            errors.append((name, error.message))
+    return errors
+
+
+def profile_imports(modules=STARTUP_MODULES, limit=15):
+    """Import modules in a clean interpreter under ``-X importtime``.
+
+    Returns ``(total_seconds, slowest)`` where slowest is a list of
+    ``(module, cumulative_seconds)`` for top-level imports.
+    """
+    code = (
+        "import django; django.setup(); "
+        + "; ".join(f"import {module}" for module in modules)
+    )
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=settings.BASE_DIR,
+    )
+
+    top_level = []
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            top_level.append((match.group(4), int(match.group(2)) / 1e6))
+
+    total = sum(seconds for _, seconds in top_level)
+    slowest = sorted(top_level, key=lambda item: item[1], reverse=True)[:limit]
+    return total, slowest
+
+
+def _load_schema():
+    from .schema import schema
+
+    return schema
+
+
+def _open_connections():
+    for connection in connections.all():
+        connection.ensure_connection()
@@ -14,16 +14,29 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-from core.models import Organization, Project, Task, TaskComment
+from core.models import (
+    ArchivedProject, ArchivedTask, ArchivedTaskComment, Job, Organization, OrganizationAnalytics,
+    Project, Task, TaskComment, Tombstone,
+)
+from core.purge import raw_delete
 
 def create_sample_data():
     """Create sample organizations, projects, tasks, and comments."""
     
-    # Clear existing data
-    TaskComment.objects.all().delete()
-    Task.objects.all().delete()
-    Project.objects.all().delete()
-    Organization.objects.all().delete()
+    # Clear existing data, children first, without loading rows into memory
+    for queryset in (
+        TaskComment.objects.all(),
+        Task.objects.all(),
+        Project.all_objects.all(),
+        ArchivedTaskComment.objects.all(),
+        ArchivedTask.objects.all(),
+        ArchivedProject.objects.all(),
+        Job.objects.all(),
+        Tombstone.objects.all(),
+        OrganizationAnalytics.objects.all(),
+        Organization.objects.all(),
+    ):
+        raw_delete(queryset)
     
     print("Creating sample organizations...")
     
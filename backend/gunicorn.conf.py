@@ -0,0 +1,57 @@
+"""
+Gunicorn configuration for production: `gunicorn` from backend/.
+
+Uses config.settings_production unless DJANGO_SETTINGS_MODULE says
+otherwise, and takes its limits from the SERVE_* settings. The master
+loads and warms up the app once (--preload), then forks sync workers.
+Workers are replaced after SERVE_MAX_REQUESTS requests (plus up to
+SERVE_MAX_REQUESTS_JITTER, so they don't all restart together) or once
+their memory passes SERVE_MAX_RSS_MB. On SIGTERM in-flight requests get
+SERVE_SHUTDOWN_TIMEOUT seconds to finish.
+"""
+
+import gc
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings_production')
+
+from django.conf import settings  # noqa: E402
+
+wsgi_app = 'config.wsgi:application'
+bind = settings.SERVE_BIND
+workers = settings.SERVE_WORKERS or (os.cpu_count() or 1) * 2 + 1
+preload_app = True
+max_requests = settings.SERVE_MAX_REQUESTS
+max_requests_jitter = settings.SERVE_MAX_REQUESTS_JITTER
+graceful_timeout = settings.SERVE_SHUTDOWN_TIMEOUT
+
+
+def on_starting(server):
+    from core.warmup import WarmupError, warm_up
+
+    if settings.DEBUG:
+        raise SystemExit("DEBUG is on, which keeps every SQL query in memory; use config.settings_production")
+    try:
+        timings = warm_up()
+    except WarmupError as e:
+        raise SystemExit(f"Operation validation failed: {e}")
+    server.log.info("Warmed up in %.1f ms", sum(s for _, s in timings) * 1000)
+    # Keep the warmed-up objects out of the collector so workers don't
+    # touch (and copy) those pages when they run a collection
+    gc.freeze()
+
+
+def pre_fork(server, worker):
+    from django.db import connections
+
+    # Never share the master's database connections with a worker
+    connections.close_all()
+
+
+def post_request(worker, req, environ, resp):
+    from core.server import rss_mb
+
+    if settings.SERVE_MAX_RSS_MB and rss_mb() > settings.SERVE_MAX_RSS_MB:
+        worker.log.info("Worker %s recycling (max_rss)", worker.pid)
+        # The sync worker exits after this request and the master forks a new one
+        worker.alive = False
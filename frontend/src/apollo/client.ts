@@ -7,8 +7,10 @@ const backendUrl = isDevelopment
   ? "http://localhost:8000/graphql/"
   : "/graphql/";
 
+// Queries go over GET so the browser can revalidate them with ETags
 const httpLink = new HttpLink({
   uri: backendUrl,
+  useGETForQueries: true,
 });
 
 const errorLink = onError((errorObj: any) => {
@@ -1,5 +1,7 @@
 import { gql } from "@apollo/client";
 
+// Mirrored in backend/core/operations.py for startup validation; keep in sync.
+
 export const CREATE_PROJECT = gql`
   mutation CreateProject(
     $organizationSlug: String!
@@ -1,5 +1,7 @@
 import { gql } from '@apollo/client';
 
+// Mirrored in backend/core/operations.py for startup validation; keep in sync.
+
 export const GET_PROJECTS = gql`
   query GetProjects($organizationSlug: String!) {
     projects(organizationSlug: $organizationSlug) {